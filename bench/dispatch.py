@@ -0,0 +1,83 @@
+"""
+Project: Interpret of XML code representation
+Author: David Oravec (xorave05)
+File: bench/dispatch.py
+Description:
+    Compares overhead of instruction dispatch - dict of handlers built
+    for every instruction and looked up by opcode name (former mySwitch)
+    against one table of handlers indexed by numeric opcode
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import interpret
+
+
+# handler which does nothing, so only dispatch itself is measured
+def nop(argument):
+    return
+
+
+"""
+    creates function equal to former mySwitch - dict literal with all
+    handlers is built on every call and opcode name is looked up in it
+"""
+
+def createOldSwitch():
+    entries = ",\n                ".join('"%s": nop' % name for name in interpret.OPCODES)
+    source = ("def mySwitch(argument):\n"
+              "    switcher = {" + entries + "}\n"
+              "    if argument[1][0] not in switcher:\n"
+              "        sys.exit(32)\n"
+              "    execs = switcher.get(argument[1][0], lambda: 'Wrong instruction!\\n')\n"
+              "    return execs(argument[1])\n")
+    scope = {"nop": nop, "sys": sys}
+    exec(source, scope)
+    return scope["mySwitch"]
+
+
+def runOld(instr):
+    mySwitch = createOldSwitch()
+    for instruction in instr:
+        mySwitch(instruction)
+
+
+def runNew(instr):
+    handlers = (nop,) * len(interpret.HANDLERS)
+    for instruction in instr:
+        handlers[instruction[1][0]](instruction[1])
+
+
+def measure(function, instr, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(instr)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(instr) * 1e9
+
+
+def main():
+    argsparser = argparse.ArgumentParser(description="Dispatch microbenchmark")
+    argsparser.add_argument("--count", type=int, default=1000000, help="Number of dispatched instructions")
+    argsparser.add_argument("--repeat", type=int, default=5, help="Best of how many runs is taken")
+    args = argsparser.parse_args()
+
+    count = len(interpret.OPCODES)
+    oldInstr = [(i, [interpret.OPCODES[i % count], []]) for i in range(args.count)]
+    newInstr = [(i, [i % count, []]) for i in range(args.count)]
+
+    old = measure(runOld, oldInstr, args.repeat)
+    new = measure(runNew, newInstr, args.repeat)
+    print("dict built per instruction: %8.1f ns/instruction" % old)
+    print("table of handlers:          %8.1f ns/instruction" % new)
+    print("speedup:                    %8.1fx" % (old / new))
+
+
+if __name__ == "__main__":
+    main()
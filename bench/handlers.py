@@ -0,0 +1,130 @@
+"""
+Project: Interpret of XML code representation
+Author: David Oravec (xorave05)
+File: bench/handlers.py
+Description:
+    Microbenchmark of handlers of instructions - every case calls handlers
+    directly (without the execution loop) with prepared operands, which are
+    literals or variables of different types, and reports ns per instruction
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import interpret
+
+
+# variables of global frame with their initial values
+VARIABLES = {"i": 7, "j": 3, "f": 1.5, "g": 0.25, "s": "hello world", "t": "abc",
+             "b": True, "c": False, "n": interpret.NIL, "d": None}
+NAMES = list(VARIABLES)
+
+
+def var(name):
+    return ('var', (interpret.GF, NAMES.index(name)))
+
+
+def op(name, *args):
+    return (interpret.OPCODE_INDEX[name], args)
+
+
+# handler which does nothing, measures overhead of the benchmark loop
+def nop(interpreter, argument):
+    return
+
+
+# cases of benchmark, name and instructions executed in every iteration
+CASES = [
+    ("loop overhead", [(None, ())]),
+    ("MOVE literal", [op("MOVE", var("d"), ('int', 1))]),
+    ("MOVE var", [op("MOVE", var("d"), var("s"))]),
+    ("ADD int literals", [op("ADD", var("d"), ('int', 1), ('int', 2))]),
+    ("ADD int vars", [op("ADD", var("d"), var("i"), var("j"))]),
+    ("ADD float vars", [op("ADD", var("d"), var("f"), var("g"))]),
+    ("MUL int var literal", [op("MUL", var("d"), var("i"), ('int', 3))]),
+    ("IDIV int vars", [op("IDIV", var("d"), var("i"), var("j"))]),
+    ("DIV float vars", [op("DIV", var("d"), var("f"), var("g"))]),
+    ("LT int vars", [op("LT", var("d"), var("i"), var("j"))]),
+    ("LT string vars", [op("LT", var("d"), var("s"), var("t"))]),
+    ("EQ int vars", [op("EQ", var("d"), var("i"), var("j"))]),
+    ("EQ string var literal", [op("EQ", var("d"), var("s"), ('string', "hello world"))]),
+    ("EQ nil var", [op("EQ", var("d"), var("n"), var("i"))]),
+    ("AND bool vars", [op("AND", var("d"), var("b"), var("c"))]),
+    ("NOT bool var", [op("NOT", var("d"), var("b"))]),
+    ("CONCAT string vars", [op("CONCAT", var("d"), var("s"), var("t"))]),
+    ("CONCAT var literal", [op("CONCAT", var("d"), var("t"), ('string', "xyz"))]),
+    ("STRLEN var", [op("STRLEN", var("d"), var("s"))]),
+    ("GETCHAR var int literal", [op("GETCHAR", var("d"), var("s"), ('int', 4))]),
+    ("SETCHAR int literal", [op("SETCHAR", var("s"), ('int', 4), ('string', "O"))]),
+    ("STRI2INT var int var", [op("STRI2INT", var("d"), var("s"), var("j"))]),
+    ("INT2CHAR int var", [op("INT2CHAR", var("d"), ('int', 97))]),
+    ("INT2FLOAT int var", [op("INT2FLOAT", var("d"), var("i"))]),
+    ("TYPE var", [op("TYPE", var("d"), var("f"))]),
+    ("WRITE int var", [op("WRITE", var("i"))]),
+    ("WRITE string var", [op("WRITE", var("s"))]),
+    ("WRITE float var", [op("WRITE", var("f"))]),
+    ("PUSHS + POPS", [op("PUSHS", var("i")), op("POPS", var("d"))]),
+    ("PUSHS literal + POPS", [op("PUSHS", ('string', "abc")), op("POPS", var("d"))]),
+    ("ADDS (2x PUSHS, POPS)", [op("PUSHS", var("i")), op("PUSHS", var("j")), op("ADDS"),
+                               op("POPS", var("d"))]),
+    ("CREATEFRAME", [op("CREATEFRAME")]),
+    ("PUSHFRAME + POPFRAME", [op("PUSHFRAME"), op("POPFRAME")]),
+    ("JUMP", [op("JUMP", ('label', 0))]),
+    ("JUMPIFEQ int vars taken", [op("JUMPIFEQ", ('label', 0), var("i"), var("i"))]),
+    ("JUMPIFEQ int vars not taken", [op("JUMPIFEQ", ('label', 0), var("i"), var("j"))]),
+    ("JUMPIFNEQ string literal", [op("JUMPIFNEQ", ('label', 0), var("s"), ('string', "abc"))]),
+    ("CALL + RETURN", [op("CALL", ('label', 0)), op("RETURN")]),
+]
+
+
+"""
+    sets state of the interpret, so every case starts with the same variables
+    output of WRITE is thrown away
+"""
+
+def resetState(interpreter, outputFile):
+    interpreter.reset(None, outputFile, outputFile, None, (), None, None)
+    interpreter.frames[interpret.GF] = [VARIABLES[name] for name in NAMES]
+    interpreter.frames[interpret.TF] = interpreter.newFrame(interpret.TF)
+
+
+def measure(interpreter, outputFile, program, count, repeat):
+    calls = [(nop if opcode is None else interpret.HANDLERS[opcode], (opcode, args))
+             for opcode, args in program]
+    best = None
+    for _ in range(repeat):
+        resetState(interpreter, outputFile)
+        start = time.perf_counter()
+        for _ in range(count):
+            for handler, instruction in calls:
+                handler(interpreter, instruction)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / (count * len(calls)) * 1e9
+
+
+def main():
+    argsparser = argparse.ArgumentParser(description="Microbenchmark of handlers of instructions")
+    argsparser.add_argument("cases", nargs="*", help="Only cases which contain one of these words")
+    argsparser.add_argument("--count", type=int, default=200000, help="Number of iterations of every case")
+    argsparser.add_argument("--repeat", type=int, default=3, help="Best of how many runs is taken")
+    args = argsparser.parse_args()
+
+    interpreter = interpret.Interpreter((), {"target": 0}, (NAMES, [], []))
+    outputFile = open(os.devnull, "w")
+    print("%-32s %10s" % ("case", "ns/instr"))
+    for name, program in CASES:
+        if args.cases and not any(word.lower() in name.lower() for word in args.cases):
+            continue
+        # instructions of the case have to be valid
+        interpret.verifyProgram([(i + 1, instruction) for i, instruction in enumerate(program)
+                                 if instruction[0] is not None])
+        print("%-32s %10.1f" % (name, measure(interpreter, outputFile, program, args.count, args.repeat)))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Project: Interpret of XML code representation
+Author: David Oravec (xorave05)
+File: bench/loader.py
+Description:
+    Measures how long readSource takes for programs of growing size
+    and checks that loading time grows linearly with number of instructions
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import interpret
+
+
+"""
+    generates XML program with count instructions, orders are shuffled
+    a bit so the loader has to reorder them
+"""
+
+def generateProgram(count):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n<program language="IPPcode20">\n']
+    body = [
+        ('DEFVAR', '<arg1 type="var">GF@v{0}</arg1>'),
+        ('MOVE', '<arg1 type="var">GF@v{0}</arg1><arg2 type="int">{0}</arg2>'),
+        ('ADD', '<arg1 type="var">GF@v{0}</arg1><arg2 type="var">GF@v{0}</arg2><arg3 type="int">1</arg3>'),
+        ('WRITE', '<arg1 type="string">value\\032of\\032v{0}</arg1>'),
+    ]
+    for i in range(count):
+        # neighbouring pairs are swapped
+        order = i + 2 if i % 2 == 0 else i
+        opcode, args = body[i % len(body)]
+        out.append('  <instruction order="%d" opcode="%s">%s</instruction>\n'
+                   % (order, opcode, args.format(i // len(body))))
+    out.append('</program>\n')
+    return "".join(out)
+
+
+def measure(count, repeat):
+    source = generateProgram(count)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        instr = interpret.readSource(io.StringIO(source))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    assert len(instr) == count
+    return best
+
+
+def main():
+    argsparser = argparse.ArgumentParser(description="Loader scaling benchmark")
+    argsparser.add_argument("--sizes", nargs="+", type=int, default=[25000, 50000, 100000, 200000],
+                            help="Numbers of instructions of generated programs")
+    argsparser.add_argument("--repeat", type=int, default=3, help="Best of how many runs is taken")
+    argsparser.add_argument("--tolerance", type=float, default=1.5,
+                            help="Maximum allowed growth of time per instruction")
+    args = argsparser.parse_args()
+
+    results = []
+    print("%12s %12s %14s" % ("instructions", "time [s]", "us/instruction"))
+    for count in args.sizes:
+        elapsed = measure(count, args.repeat)
+        results.append((count, elapsed))
+        print("%12d %12.3f %14.2f" % (count, elapsed, elapsed / count * 1e6))
+
+    # time per instruction of the biggest program compared to the smallest one
+    first = results[0][1] / results[0][0]
+    last = results[-1][1] / results[-1][0]
+    growth = last / first
+    print("growth of time per instruction: %.2f" % growth)
+    if growth > args.tolerance:
+        print("loading does not scale linearly!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Project: Interpret of XML code representation
+Author: David Oravec (xorave05)
+File: bench/run.py
+Description:
+    Runs interpret.py on benchmark programs in bench/programs, checks their
+    output, reports time and executed instructions per second and compares
+    times with the baseline (bench/baseline.json) to find regressions
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROGRAMS_DIR = os.path.join(BENCH_DIR, "programs")
+BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+INTERPRET = os.path.join(BENCH_DIR, "..", "interpret.py")
+
+
+"""
+    returns names of benchmark programs (XML files in PROGRAMS_DIR
+    without extension), only names given in selected if it's not empty
+"""
+
+def findPrograms(selected):
+    names = sorted(name[:-4] for name in os.listdir(PROGRAMS_DIR) if name.endswith(".xml"))
+    if selected:
+        unknown = set(selected) - set(names)
+        if unknown:
+            print("unknown programs: " + ", ".join(sorted(unknown)))
+            sys.exit(1)
+        names = [name for name in names if name in selected]
+    return names
+
+
+"""
+    checks output of the program against program.out (if it exists)
+"""
+
+def checkOutput(name, output):
+    expectedPath = os.path.join(PROGRAMS_DIR, name + ".out")
+    if not os.path.exists(expectedPath):
+        return True
+    with open(expectedPath, "rb") as expectedFile:
+        return expectedFile.read() == output
+
+
+"""
+    runs interpret on the program once and checks its output, program.in
+    is used as input if it exists
+    number of executed instructions is counted only if statsPath is given,
+    so timed runs are not slowed down by statistics
+    returns time in seconds and number of executed instructions (or None)
+"""
+
+def runProgram(interpret, name, statsPath=None):
+    source = os.path.join(PROGRAMS_DIR, name + ".xml")
+    inputPath = os.path.join(PROGRAMS_DIR, name + ".in")
+    if not os.path.exists(inputPath):
+        inputPath = os.devnull
+    command = [sys.executable, interpret, "--source=" + source, "--input=" + inputPath]
+    if statsPath is not None:
+        command += ["--stats=" + statsPath, "--insts"]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        print("%s: interpret ended with %d" % (name, process.returncode))
+        sys.stdout.write(process.stderr.decode(errors="replace"))
+        sys.exit(1)
+    if not checkOutput(name, process.stdout):
+        print("%s: wrong output" % name)
+        sys.exit(1)
+
+    if statsPath is None:
+        return elapsed, None
+    with open(statsPath) as statsFile:
+        return elapsed, int(statsFile.readline())
+
+
+def main():
+    argsparser = argparse.ArgumentParser(description="Runs benchmark programs and compares them with baseline")
+    argsparser.add_argument("programs", nargs="*", help="Names of programs to run (all by default)")
+    argsparser.add_argument("--repeat", type=int, default=3, help="Best of how many runs is taken")
+    argsparser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Allowed slowdown against baseline (0.2 = 20 %%)")
+    argsparser.add_argument("--interpret", default=INTERPRET, help="Path to interpret.py")
+    argsparser.add_argument("--baseline", default=BASELINE, help="Baseline JSON file")
+    argsparser.add_argument("--update-baseline", action="store_true",
+                            help="Stores measured times as the new baseline")
+    args = argsparser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baselineFile:
+            baseline = json.load(baselineFile)
+
+    results = {}
+    regressions = list()
+    print("%-12s %10s %12s %14s %12s %9s" % ("program", "time [s]", "insts", "insts/s", "baseline [s]", "change"))
+    with tempfile.TemporaryDirectory() as tempDir:
+        statsPath = os.path.join(tempDir, "stats")
+        for name in findPrograms(args.programs):
+            insts = runProgram(args.interpret, name, statsPath)[1]
+            best = None
+            for _ in range(args.repeat):
+                elapsed = runProgram(args.interpret, name)[0]
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = {"time": round(best, 4), "insts": insts}
+
+            line = "%-12s %10.3f %12d %14.0f" % (name, best, insts, insts / best)
+            if name in baseline:
+                change = best / baseline[name]["time"] - 1
+                line += " %12.3f %+8.1f%%" % (baseline[name]["time"], change * 100)
+                if change > args.tolerance:
+                    regressions.append(name)
+                    line += "  REGRESSION"
+            print(line)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as baselineFile:
+            json.dump(baseline, baselineFile, indent=2, sort_keys=True)
+            baselineFile.write("\n")
+        print("baseline updated")
+    elif regressions:
+        print("slower than baseline: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Project: Interpret of XML code representation
+Author: David Oravec (xorave05)
+File: bench/strings.py
+Description:
+    Measures decoding of escape sequences in big string literals - former
+    changeString (char by char) against the current one, and loading
+    of the whole program where the same literals are decoded only once
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import interpret
+
+
+# former changeString, decodes escape sequences char by char
+def oldChangeString(str):
+    out = ""            # stores output string
+    isEscape = False    # for escape sequences
+    escVal = ""         # temp var for escape sequences
+
+    for i in str:
+        if isEscape is True:    # escape sequence
+            escVal += i
+            if len(escVal) == 3:    # escape sequence of 3 chars was loaded
+                out += chr(int(escVal))     # converting
+                escVal = ""
+                isEscape = False
+        # handling for non-escaped chars
+        else:
+            if i != "\\":
+                out += i
+            else:
+                isEscape = True
+
+    return out
+
+
+"""
+    generates string literal of given size (in chars), every fourth word
+    is separated by escaped space and there is escaped newline after every line
+"""
+
+def generateLiteral(size, seed):
+    words = ["lorem", "ipsum\\035dolor", "sit", "amet\\092", "ěščř"]
+    out = []
+    length = 0
+    i = seed
+    while length < size:
+        word = words[i % len(words)] + ("\\032" if i % 4 else "\\010")
+        out.append(word)
+        length += len(word)
+        i += 1
+    return "".join(out)
+
+
+"""
+    generates XML program which writes count literals, there are only
+    distinct literals, the rest are repeated
+"""
+
+def generateProgram(literals, count):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n<program language="IPPcode20">\n']
+    for i in range(count):
+        out.append('  <instruction order="%d" opcode="WRITE"><arg1 type="string">%s</arg1></instruction>\n'
+                   % (i + 1, literals[i % len(literals)]))
+    out.append('</program>\n')
+    return "".join(out)
+
+
+def measure(function, argument, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def decodeAll(function):
+    return lambda literals: [function(literal) for literal in literals]
+
+
+def main():
+    argsparser = argparse.ArgumentParser(description="String literal decoding benchmark")
+    argsparser.add_argument("--size", type=int, default=1 << 20, help="Size of one literal in chars")
+    argsparser.add_argument("--distinct", type=int, default=4, help="Number of distinct literals")
+    argsparser.add_argument("--count", type=int, default=16, help="Number of instructions with literal")
+    argsparser.add_argument("--repeat", type=int, default=3, help="Best of how many runs is taken")
+    args = argsparser.parse_args()
+
+    literals = [generateLiteral(args.size, seed) for seed in range(args.distinct)]
+    megabytes = args.size * len(literals) / 1e6
+
+    old, oldResult = measure(decodeAll(oldChangeString), literals, args.repeat)
+    new, newResult = measure(decodeAll(interpret.changeString), literals, args.repeat)
+    assert oldResult == newResult
+    print("char by char decoding:  %8.3f s (%7.1f MB/s)" % (old, megabytes / old))
+    print("regex decoding:         %8.3f s (%7.1f MB/s)" % (new, megabytes / new))
+    print("speedup:                %8.1fx" % (old / new))
+
+    source = generateProgram(literals, args.count)
+    load, instr = measure(lambda text: interpret.readSource(io.StringIO(text)), source, args.repeat)
+    assert len(instr) == args.count
+    shared = len({id(instruction[1][1][0][1]) for instruction in instr})
+    print("loading of %d literals (%.1f MB): %.3f s, %d distinct string objects"
+          % (args.count, len(source) / 1e6, load, shared))
+
+
+if __name__ == "__main__":
+    main()
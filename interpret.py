@@ -8,155 +8,594 @@ Description:
 
 import xml.etree.ElementTree as ET
 import argparse
+import gc
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
 import sys
-from collections import Counter
-
-# GLOBAL variables
-
-hashTable = {}
-stackOfFrames = list()
-stackOfVars = list()
-stackOfCalls = list()
-instrPointer, varCounter, instrCounter = 0, 0, 0
-statsFile = None
+import time
+
+# modules used only by --serve and by runs for more inputs are imported
+# where they are used, so they don't slow down start of every run
+
+# has to be changed whenever representation of decoded program changes,
+# so old entries of the program cache are not used
+CACHE_VERSION = "8"
+
+# exit code of program which ended by unexpected error of the interpret
+INTERNAL_ERROR = 99
+
+# hash of source of this interpret, it's part of keys of memoized results,
+# so results of other versions of the interpret are not used
+with open(__file__, "rb") as interpretFile:
+    INTERPRET_HASH = hashlib.sha256(interpretFile.read()).hexdigest()
+
+# default maximum size of memoized results (--memo-dir) in bytes
+MEMO_SIZE = 64 << 20
+
+# number of decoded programs kept loaded by --batch and by every worker of the service
+SERVICE_CACHE_SIZE = 64
+
+# output is written to outputFile after this number of characters is collected
+OUTPUT_BUFFER_SIZE = 1 << 16
+# input for READ is read in blocks of this number of characters
+INPUT_BLOCK_SIZE = 1 << 20
+
+# all instructions of IPPcode20 (with extensions), index is numeric opcode
+OPCODES = ("MOVE", "CREATEFRAME", "PUSHFRAME", "POPFRAME", "DEFVAR", "CALL",
+           "RETURN", "PUSHS", "POPS", "ADD", "SUB", "MUL", "IDIV", "LT", "GT",
+           "EQ", "AND", "OR", "NOT", "INT2CHAR", "STRI2INT", "READ", "WRITE",
+           "CONCAT", "STRLEN", "GETCHAR", "SETCHAR", "TYPE", "EXIT", "LABEL",
+           "DPRINT", "JUMP", "JUMPIFEQ", "JUMPIFNEQ", "BREAK", "ADDS", "SUBS",
+           "MULS", "IDIVS", "LTS", "GTS", "EQS", "ANDS", "ORS", "NOTS",
+           "INT2CHARS", "STRI2INTS", "JUMPIFEQS", "JUMPIFNEQS", "CLEARS", "DIV",
+           "INT2FLOAT", "FLOAT2INT", "DIVS", "INT2FLOATS", "FLOAT2INTS")
+OPCODE_INDEX = {name: index for index, name in enumerate(OPCODES)}
+# instructions with target of jump as first argument
+JUMP_OPCODES = frozenset(OPCODE_INDEX[name] for name in (
+    "CALL", "JUMP", "JUMPIFEQ", "JUMPIFNEQ", "JUMPIFEQS", "JUMPIFNEQS"))
+# instructions which need their position in the program
+POINTER_OPCODES = frozenset(OPCODE_INDEX[name] for name in ("CALL", "BREAK"))
+# unknown instructions are reported by verifyProgram
+UNKNOWN_OPCODE = len(OPCODES)
+# operands of instructions, every operand is (kind, exit code if operand is
+# of another kind), symb is variable or constant
+OPERANDS = {
+    "MOVE": (('var', 32), ('symb', 32)),
+    "DEFVAR": (('var', 32),),
+    "CALL": (('label', 32),),
+    "PUSHS": (('symb', 53),),
+    "POPS": (('var', 53),),
+    "READ": (('var', 32), ('type', 53)),
+    "WRITE": (('symb', 53),),
+    "TYPE": (('var', 32), ('symb', 53)),
+    "EXIT": (('symb', 53),),
+    "LABEL": (('label', 32),),
+    "DPRINT": (('symb', 53),),
+    "JUMP": (('label', 53),),
+    "JUMPIFEQ": (('label', 53), ('symb', 53), ('symb', 53)),
+    "JUMPIFNEQ": (('label', 53), ('symb', 53), ('symb', 53)),
+    "JUMPIFEQS": (('label', 32),),
+    "JUMPIFNEQS": (('label', 32),),
+}
+for name in ("ADD", "SUB", "MUL", "IDIV", "DIV", "LT", "GT", "EQ", "AND", "OR",
+             "STRI2INT", "CONCAT", "GETCHAR", "SETCHAR"):
+    OPERANDS[name] = (('var', 32), ('symb', 53), ('symb', 53))
+for name in ("NOT", "INT2CHAR", "STRLEN", "INT2FLOAT", "FLOAT2INT"):
+    OPERANDS[name] = (('var', 32), ('symb', 53))
+for name in OPCODES:
+    OPERANDS.setdefault(name, ())
+# kinds of frames, index to frames
+GF, LF, TF = 0, 1, 2
+FRAME_KINDS = {"GF": GF, "LF": LF, "TF": TF}
+# slot of variable which wasn't defined by DEFVAR yet (None is uninitialized variable)
+UNDEFINED = object()
+# allowed types of arguments, index is used in binary format
+ARG_TYPES = ("string", "int", "var", "type", "nil", "bool", "label", "float")
+
+# binary format of program (.ippc), all numbers are little endian
+#   header, table of instructions, table of labels, names of variables
+#   (global, then local), constant pool
+# every argument of instruction and every name is index to constant pool
+BINARY_MAGIC = b"IPPC"
+BINARY_VERSION = 3
+BINARY_HEADER = struct.Struct("<4sHHIIIII") # magic, version, -, instructions, labels,
+                                            # global names, local names, constants
+BINARY_INSTR = struct.Struct("<IBBxx3I")    # order, opcode, number of args, 3 args
+BINARY_LABEL = struct.Struct("<II")         # name (index of constant), index of instruction
+BINARY_CONST = struct.Struct("<BI")         # type, length of value (NO_VALUE if none)
+BINARY_FLOAT = struct.Struct("<d")
+BINARY_VAR = struct.Struct("<BI")           # frame, slot
+BINARY_INDEX = struct.Struct("<I")          # index of constant or instruction
+BINARY_TARGET = 0xFF                        # type of resolved target of jump
+BINARY_NO_VALUE = 0xFFFFFFFF
 
 """
     function for handling arguments
-    returns sourceFile (if defined), inputFile (if defined), 
-    statsFile (if defined) or exits with proper exit code
+    returns sourceFile, inputFile, outputFile, statsFile (if defined),
+    profileFile (if defined) and parsed arguments or exits with proper exit code
 """
 
 def argHandler():
     argsparser = argparse.ArgumentParser(description="Loads XML code, transforms it to IPPcode20 and executes it")
     argsparser.add_argument("--source", nargs=1, help="Input file with XML code")
-    argsparser.add_argument("--input", nargs=1, help="File with inputs(f.e. instruction READ)")
+    argsparser.add_argument("--input", action="append",
+                            help="File with inputs(f.e. instruction READ), program is run for every given file")
     argsparser.add_argument("--stats", nargs=1, help="Specifies file where wtats will be written")
     argsparser.add_argument("--insts", action="store_true", help="Number of executed instructions, requires --stats")
     argsparser.add_argument("--vars", action="store_true", help="Number of maximum initialized vars, requires --stats")
+    argsparser.add_argument("--hot", action="store_true", help="Order of the most executed instruction, requires --stats")
+    argsparser.add_argument("--frequent", action="store_true",
+                            help="Most frequent opcodes in the program, requires --stats")
+    argsparser.add_argument("--stack", action="store_true", help="Maximum depth of data stack, requires --stats")
+    argsparser.add_argument("--calls", action="store_true", help="Maximum depth of call stack, requires --stats")
+    argsparser.add_argument("--frames", action="store_true", help="Maximum number of local frames, requires --stats")
+    argsparser.add_argument("--cache-dir", help="Directory where decoded programs are cached")
+    argsparser.add_argument("--source-binary", nargs=1, help="Input file with compiled program (.ippc)")
+    argsparser.add_argument("--compile-binary", nargs=1,
+                            help="Compiles XML code to the file in binary format (.ippc) and exits")
+    argsparser.add_argument("--output", nargs=1, help="File where output of the program will be written")
+    argsparser.add_argument("--profile", nargs=1,
+                            help="File where profile of execution will be written (JSON if it ends with .json)")
+    argsparser.add_argument("--batch", nargs=1,
+                            help="Runs all programs from the manifest file, results are written to output")
+    argsparser.add_argument("--jobs", type=int,
+                            help="Maximum number of processes running the program for more inputs "
+                                 "or number of workers of the service (all cores by default)")
+    argsparser.add_argument("--serve", nargs="?", const="-",
+                            help="Runs service executing jobs given as JSON lines on stdin or on the Unix socket")
+    argsparser.add_argument("--memo-dir", help="Directory where results of runs are memoized")
+    argsparser.add_argument("--memo-size", type=int,
+                            help="Maximum size of memoized results in bytes, least recently used are removed")
+    argsparser.add_argument("--memo-clear", action="store_true", help="Removes all memoized results")
 
     args = argsparser.parse_args()
+    if args.source is not None and args.source_binary is not None:
+        sys.exit(10)
+    if args.source_binary is not None:
+        if args.compile_binary is not None:
+            sys.exit(10)
+        args.source = args.source_binary
+    if args.batch is not None:
+        # programs and their inputs are given by the manifest
+        if args.source is not None or args.input is not None or args.compile_binary is not None \
+                or args.stats is not None or args.profile is not None or args.memo_dir is not None:
+            sys.exit(10)
+        args.source = args.batch
+    if args.serve is not None:
+        # programs and their inputs are given by jobs
+        if args.source is not None or args.input is not None or args.compile_binary is not None \
+                or args.stats is not None or args.profile is not None or args.output is not None \
+                or args.batch is not None or args.memo_dir is not None:
+            sys.exit(10)
     # there has to be at least one of them defined
-    if args.input is None and args.source is None:
+    elif args.input is None and args.source is None and args.compile_binary is None and not args.memo_clear:
+        sys.exit(10)
+    if args.memo_dir is None and (args.memo_size is not None or args.memo_clear):
+        sys.exit(10)
+    if args.memo_size is not None and args.memo_size < 0:
+        sys.exit(10)
+    if args.input is not None and len(args.input) > 1:
+        # results of runs for more inputs are written to output
+        if args.source is None or args.compile_binary is not None or args.stats is not None \
+                or args.profile is not None or args.memo_dir is not None:
+            sys.exit(10)
+    if args.jobs is not None and args.jobs < 1:
         sys.exit(10)
 
     try:
         if args.input is None:
             inputFile = sys.stdin
+        elif len(args.input) > 1:
+            inputFile = None    # inputs are opened by workers
         else:
             inputFile = open(args.input[0], "r")
 
         if args.source is None:
             sourceFile = sys.stdin
+        elif args.source_binary is not None:
+            sourceFile = open(args.source[0], "rb")
         else:
             sourceFile = open(args.source[0], "r")
     except:
         sys.exit(11)
-    global statsFile
+    statsFile, outputFile, profileFile = None, sys.stdout, None
     try:
         if args.stats is not None:
             statsFile = open(args.stats[0], "w")
+        if args.output is not None:
+            outputFile = open(args.output[0], "w")
+        if args.profile is not None:
+            profileFile = open(args.profile[0], "w")
     except:
         sys.exit(12)
 
-    if (args.insts is True or args.vars is True) and statsFile is None:
+    if (args.insts or args.vars or args.hot or args.frequent or args.stack or args.calls or args.frames) \
+            and statsFile is None:
         sys.exit(10)
 
-    return sourceFile, inputFile, statsFile
+    return sourceFile, inputFile, outputFile, statsFile, profileFile, args
+
+
+"""
+   decodes one <instruction> element into (order, [numeric opcode, args])
+   every distinct argument is decoded only once, decoded arguments are kept
+   in literals (type, text) -> (type, value), so same literals share one object
+   returns error code as third value (0 if instruction is correct)
+"""
+
+def readInstruction(instruction, literals):
+    if len(instruction.attrib) != 2:
+        return None, None, 32
+    if instruction.tag != 'instruction':
+        return None, None, 32
+
+    order = instruction.attrib.get("order")
+    opcode = instruction.attrib.get("opcode")
+    if opcode is None or opcode == "none" or order is None:
+        return None, None, 32
+
+    args = list()
+    err = list()
+    try:
+        for i in range(len(instruction)):
+            xmlArg = instruction.find("arg" + str(i + 1))
+            if xmlArg is None:
+                err.append(32)
+                raise
+            if xmlArg.attrib["type"] not in ARG_TYPES:
+                err.append(53)
+                raise
+            if len(xmlArg.attrib) != 1:
+                err.append(32)
+                raise
+            key = (xmlArg.attrib["type"], xmlArg.text)
+            arg = literals.get(key)
+            if arg is None:
+                text = xmlArg.text
+                if key[0] == 'string' and text is not None:
+                    if FORBIDDEN_CHARS.search(text) is not None:
+                        err.append(32)
+                        raise
+                    text = changeString(text)
+                try:
+                    arg = (key[0], decodeLiteral(key[0], text))
+                except ValueError:
+                    err.append(32)
+                    raise
+                literals[key] = arg
+            args.append(arg)
+            if xmlArg.tail and xmlArg.tail.strip() != "":
+                raise
+    except:
+        if len(err) != 0:
+            return None, None, err.pop(len(err) - 1)
+        else:
+            return None, None, 31
+    if instruction.text and instruction.text.strip() != "":
+        return None, None, 31
+
+    return order, [OPCODE_INDEX.get(str(opcode).upper(), UNKNOWN_OPCODE), args], 0
 
 
 """
    function for parsing source XML file
+   XML is parsed incrementally, every instruction is decoded as soon as
+   its closing tag is read and the element is thrown away, so only
+   decoded program is kept in memory
    returns dict of instruction which contains:
    order, instruction, params
 """
 
 def readSource(sourceFile):
-    orderList = list()
-    dictOfInstructions = {}
-    okCheck = False
+    dictOfInstructions = {}     # also serves as index of already used orders
+    literals = {}               # decoded arguments shared by instructions
+    maxOrder = 0
+    root = None
+    last = None     # last instruction, its tail is known after the next one starts
+    depth = 0
+    code = 0        # first error in order of the document, XML is still read to the end,
+                    # because malformed XML (31) has priority
+    lowOrder = False    # order < 1 is reported only if there is no other error
+    try:
+        for event, elem in ET.iterparse(sourceFile, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    root = elem
+                    okCheck = False
+                    for attrib, item in root.attrib.items():
+                        if attrib == "language" and item == "IPPcode20":
+                            okCheck = True
+                        if attrib != 'language' and attrib != 'name' and attrib != 'description':
+                            code = code or 32
+                    if okCheck is False:
+                        code = code or 32
+                elif depth == 2 and last is not None:
+                    if last.tail and last.tail.strip() != "":
+                        code = code or 31
+                    last = None
+                continue
+
+            depth -= 1
+            if depth != 1 or code != 0:
+                continue
+
+            order, instruction, err = readInstruction(elem, literals)
+            # element is not needed anymore, only its tail is checked later
+            root.remove(elem)
+            last = elem
+            if err != 0:
+                code = err
+                continue
+
+            try:
+                order = int(order)
+            except:
+                code = 32
+                continue
+            if order in dictOfInstructions:
+                code = 32
+                continue
+            if order < 1:
+                lowOrder = True
+            dictOfInstructions[order] = instruction
+            maxOrder = max(maxOrder, order)
+    except ET.ParseError:
+        raise InterpretError(31)
+
+    if code != 0:
+        raise InterpretError(code)
+    if (last is not None and last.tail and last.tail.strip() != "") or \
+            (root.tail and root.tail.strip() != "") or \
+            (root.text and root.text.strip() != ""):
+        raise InterpretError(31)
+    if lowOrder:
+        raise InterpretError(32)
+
+    return sortByOrder(dictOfInstructions, maxOrder)
+
+
+"""
+    sorts instructions by their order in linear time
+    orders are usually dense (1, 2, 3, ...), so every instruction is put
+    to the array on index of its order, for sparse orders sort is used
+"""
+
+def sortByOrder(dictOfInstructions, maxOrder):
+    if maxOrder > 2 * len(dictOfInstructions) + 16:
+        return sorted(dictOfInstructions.items(), key=lambda x: x[0])
+
+    slots = [None] * (maxOrder + 1)
+    for order, val in dictOfInstructions.items():
+        slots[order] = val
+    return [(order, val) for order, val in enumerate(slots) if val is not None]
+
+
+"""
+    computes hash of the source file which is used as a key to the cache
+    name of this module is part of the key, cached program refers to NIL of
+    the module which stored it (__main__ or interpret when it's imported)
+    returns hash and source file which can be read again from the beginning
+"""
+
+def sourceHash(sourceFile):
+    digest = hashlib.sha256((CACHE_VERSION + __name__ + "\0").encode())
+    if not sourceFile.seekable():
+        sourceFile = io.StringIO(sourceFile.read())
+    for chunk in iter(lambda: sourceFile.read(1 << 16), ""):
+        digest.update(chunk.encode("utf-8"))
+    sourceFile.seek(0)
+    return digest.hexdigest(), sourceFile
+
+
+"""
+    loads program from sourceFile, creates labels and resolves variables
+    if cacheDir is given, decoded program with labels is stored there
+    and next time it's loaded without parsing of XML
+    returns list of instructions, dict of labels and names of variables
+"""
+
+def loadProgram(sourceFile, cacheDir):
+    if cacheDir is None:
+        instr = readSource(sourceFile)
+        verifyProgram(instr)
+        labels = createLabels(instr)
+        names = resolveVars(instr)
+        return freezeProgram(instr), labels, names
+
+    key, sourceFile = sourceHash(sourceFile)
+    cachePath = os.path.join(cacheDir, key + ".pickle")
     try:
-        tree = ET.parse(sourceFile).getroot()
+        with open(cachePath, "rb") as cacheFile:
+            return pickle.load(cacheFile)
     except:
-        sys.exit(31)
-
-    for attrib, item in tree.attrib.items():
-        if attrib == "language" and item == "IPPcode20":
-            okCheck = True
-        if attrib != 'language' and attrib != 'name' and attrib != 'description':
-            sys.exit(32)
-    if okCheck is False:
-        sys.exit(32)
-
-    for instruction in tree:
-        if len(instruction.attrib) != 2:
-            sys.exit(32)
-        if instruction.tag != 'instruction':
-            sys.exit(32)
-
-        order = instruction.attrib["order"]
-        orderList.append(order)
-        opcode = instruction.attrib["opcode"]
-        if [k for k, v in Counter(orderList).items() if v > 1]:
-            sys.exit(32)
-
-        if opcode == "none" or order is None:
-            sys.exit(32)
-
-        array = ["\n", " ", "\t", "\v", "\f", "\r", "#"]  # these are forbidden chars
-        types = ["string", "int", "var", "type", "nil", "bool", "label", "float"]
-        try:
-            instructions = {int(order): list()}
-        except:
-            sys.exit(32)
-        args = list()
-        err = list()
-        try:
-            for i in range(len(instruction)):
-                xmlArg = instruction.find("arg" + str(i + 1))
-                if xmlArg is None:
-                    err.append(32)
-                    raise
-                if xmlArg.attrib["type"] not in types:
-                    err.append(53)
-                    raise
-                if len(xmlArg.attrib) != 1:
-                    err.append(32)
-                    raise
-                if xmlArg.attrib["type"] == 'string' and xmlArg.text is not None:
-                    if any(idx in xmlArg.text for idx in array):
-                        err.append(32)
-                        raise
-                    xmlArg.text = changeString(xmlArg.text)
-                if xmlArg.attrib["type"] == 'string' and xmlArg.text is None:
-                    arg = ('string', "")
-                else:
-                    arg = (xmlArg.attrib["type"], xmlArg.text)
-                args.append(arg)
-                if xmlArg.tail and xmlArg.tail.strip() != "":
-                    raise
-        except:
-            if len(err) != 0:
-                sys.exit(err.pop(len(err) - 1))
+        pass    # not cached yet (or cache entry is broken)
+
+    instr = readSource(sourceFile)
+    verifyProgram(instr)
+    labels = createLabels(instr)
+    names = resolveVars(instr)
+    instr = freezeProgram(instr)
+    # cache is only optimization, program runs even if it can't be written
+    try:
+        os.makedirs(cacheDir, exist_ok=True)
+        tempPath = cachePath + "." + str(os.getpid())
+        with open(tempPath, "wb") as cacheFile:
+            pickle.dump((instr, labels, names), cacheFile, pickle.HIGHEST_PROTOCOL)
+        os.replace(tempPath, cachePath)
+    except OSError:
+        pass
+    return instr, labels, names
+
+
+"""
+    replaces name of every variable in the program by (kind of frame, slot)
+    LF and TF share slots, because TF becomes LF after PUSHFRAME
+    returns names of variables for every slot of GF, LF and TF
+"""
+
+def resolveVars(instr):
+    slots = {GF: {}, LF: {}, TF: {}}
+    slots[TF] = slots[LF]
+    for order, (opcode, args) in instr:
+        for i in range(len(args)):
+            if args[i][0] != 'var':
+                continue
+            prefix, suffix = editVar(args[i][1])
+            if prefix not in FRAME_KINDS:
+                raise InterpretError(32)
+            kind = FRAME_KINDS[prefix]
+            args[i] = ('var', (kind, slots[kind].setdefault(suffix, len(slots[kind]))))
+    return list(slots[GF]), list(slots[LF]), list(slots[TF])
+
+
+"""
+    converts instructions and their arguments to tuples, program isn't changed
+    during interpretation, so it can be shared by more runs
+"""
+
+def freezeProgram(instr):
+    return tuple((order, (opcode, tuple(args))) for order, (opcode, args) in instr)
+
+
+"""
+    writes program with its labels to binaryFile in binary format
+    every distinct argument is stored only once in the constant pool,
+    variables are stored already resolved (frame and slot) and targets
+    of jumps as indexes of instructions, so loader doesn't resolve them again
+"""
+
+def writeBinary(instr, labels, names, binaryFile):
+    constIndex = {}
+    pool = list()
+
+    def addConst(arg):
+        # python type is part of the key, so f.e. int@1 and bool@true differ
+        key = (arg[0], type(arg[1]), arg[1])
+        if key not in constIndex:
+            constIndex[key] = len(pool)
+            argType = ARG_TYPES.index(arg[0])
+            if arg[1] is None or arg[0] == 'nil':
+                value = b""
+            elif arg[0] == 'var':
+                value = BINARY_VAR.pack(*arg[1])
+            elif arg[0] == 'label' and type(arg[1]) is int:
+                argType, value = BINARY_TARGET, BINARY_INDEX.pack(arg[1])
+            elif arg[0] == 'int':
+                value = arg[1].to_bytes(arg[1].bit_length() // 8 + 1, "little", signed=True)
+            elif arg[0] == 'float':
+                value = BINARY_FLOAT.pack(arg[1])
+            elif arg[0] == 'bool':
+                value = bytes([arg[1]])
             else:
-                sys.exit(31)
-        if order in instructions:
-            sys.exit(32)
-        instructions[int(order)].append(str(opcode).upper())
-        instructions[int(order)].append(args)
-        dictOfInstructions.update(instructions)
-        if (instruction.tail and instruction.tail.strip() != "") or \
-                (instruction.text and instruction.text.strip() != ""):
-            sys.exit(31)
-    dictOfInstructions = sorted(dictOfInstructions.items(), key=lambda x: x[0])
-    if (tree.tail and tree.tail.strip() != "") or \
-            (tree.text and tree.text.strip() != ""):
-        sys.exit(31)
+                value = arg[1].encode("utf-8")
+            length = BINARY_NO_VALUE if arg[1] is None else len(value)
+            pool.append(BINARY_CONST.pack(argType, length) + value)
+        return constIndex[key]
+
+    records = list()
+    for order, (opcode, args) in instr:
+        if opcode == UNKNOWN_OPCODE or len(args) > 3:
+            raise InterpretError(32)
+        indexes = [addConst(tuple(arg)) for arg in args] + [0] * (3 - len(args))
+        records.append(BINARY_INSTR.pack(order, opcode, len(args), *indexes))
+    for name, index in labels.items():
+        records.append(BINARY_LABEL.pack(addConst(('label', name)), index))
+    for name in names[GF] + names[LF]:
+        records.append(BINARY_INDEX.pack(addConst(('string', name))))
+
+    binaryFile.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(instr), len(labels),
+                                        len(names[GF]), len(names[LF]), len(pool)))
+    binaryFile.writelines(records)
+    binaryFile.writelines(pool)
 
-    for order, val in dictOfInstructions:
-        if order < 1:
-            sys.exit(32)
 
-    return dictOfInstructions
+"""
+    loads program in binary format, every constant is decoded only once
+    and shared by all instructions, which are built directly as tuples
+    variables and jumps are already resolved, loader checks that they are
+    in range, that every jump has resolved target and verifies operands
+    returns tuple of instructions, dict of labels and names of variables
+"""
+
+def readBinary(binaryFile):
+    try:
+        with mmap.mmap(binaryFile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, _, instrCount, labelCount, globalCount, localCount, constCount = \
+                BINARY_HEADER.unpack_from(data)
+            if magic != BINARY_MAGIC or version != BINARY_VERSION:
+                raise InterpretError(31)
+
+            labelStart = BINARY_HEADER.size + instrCount * BINARY_INSTR.size
+            namesStart = labelStart + labelCount * BINARY_LABEL.size
+            poolStart = namesStart + (globalCount + localCount) * BINARY_INDEX.size
+            slotCounts = (globalCount, localCount, localCount)
+            pool = list()
+            offset = poolStart
+            for _ in range(constCount):
+                argType, length = BINARY_CONST.unpack_from(data, offset)
+                offset += BINARY_CONST.size
+                if argType == BINARY_TARGET:
+                    value = BINARY_INDEX.unpack_from(data, offset)[0]
+                    if value >= instrCount:
+                        raise InterpretError(31)
+                    pool.append(('label', value))
+                    offset += length
+                    continue
+                argType = ARG_TYPES[argType]
+                if length == BINARY_NO_VALUE:
+                    if argType == 'var':
+                        raise InterpretError(31)
+                    pool.append((argType, None))
+                    continue
+                if argType == 'var':
+                    if length != BINARY_VAR.size:
+                        raise InterpretError(31)
+                    value = BINARY_VAR.unpack_from(data, offset)
+                    if value[0] >= len(slotCounts) or value[1] >= slotCounts[value[0]]:
+                        raise InterpretError(31)
+                elif argType == 'int':
+                    value = int.from_bytes(data[offset:offset + length], "little", signed=True)
+                elif argType == 'float':
+                    value = BINARY_FLOAT.unpack_from(data, offset)[0]
+                elif argType == 'bool':
+                    value = data[offset] != 0
+                elif argType == 'nil':
+                    value = NIL
+                else:
+                    value = str(data[offset:offset + length], "utf-8")
+                pool.append((argType, value))
+                offset += length
+
+            # unused arguments point to the first constant, pool can be empty
+            table = pool or [None]
+            # tables are copied, so no buffer of the mapping is exported when loading fails
+            instr = tuple((order, (opcode, (table[a], table[b], table[c])[:argc]))
+                          for order, opcode, argc, a, b, c
+                          in BINARY_INSTR.iter_unpack(data[BINARY_HEADER.size:labelStart]))
+            labels = {pool[name][1]: index
+                      for name, index in BINARY_LABEL.iter_unpack(data[labelStart:namesStart])}
+            names = [pool[name][1] for name, in BINARY_INDEX.iter_unpack(data[namesStart:poolStart])]
+
+            # opcodes and operands of jumps are checked here, other operands by verifyProgram
+            for order, (opcode, args) in instr:
+                if opcode > UNKNOWN_OPCODE:
+                    raise InterpretError(31)
+                if opcode in JUMP_OPCODES and (len(args) == 0 or type(args[0][1]) is not int):
+                    raise InterpretError(31)
+            if any(type(name) is not str for name in names):
+                raise InterpretError(31)
+    except (ValueError, IndexError, struct.error, UnicodeDecodeError, OSError):
+        raise InterpretError(31)
+
+    verifyProgram(instr)
+    return instr, labels, (names[:globalCount], names[globalCount:], names[globalCount:])
 
 
 """
@@ -172,18 +611,38 @@ def checkSymb(var):
 
 
 """
-    edit var and returns prefix and sufix to hashTable
+    checks number and kinds of operands of every instruction once before
+    interpretation, so handlers don't have to check them on every execution
+"""
+
+def verifyProgram(instr):
+    for order, (opcode, args) in instr:
+        if opcode == UNKNOWN_OPCODE:
+            raise InterpretError(32)
+        operands = OPERANDS[OPCODES[opcode]]
+        if len(args) != len(operands):
+            raise InterpretError(32)
+        for arg, (kind, code) in zip(args, operands):
+            if kind == 'symb':
+                if arg[0] != 'var' and checkSymb(arg[0]) is False:
+                    raise InterpretError(code)
+            elif arg[0] != kind:
+                raise InterpretError(code)
+
+
+"""
+    edit var and returns prefix and sufix (name of frame and variable)
 """
 
 def editVar(var):
     if var.find("@") == -1:
-        sys.exit(32)
+        raise InterpretError(32)
     else:
         prefix = var[:2]  # first 2 chars = FRAME
         suffix = var[3:]  # from third index is var
     # error handling f.e. GFa@var
     if suffix.find("@") != -1:
-        sys.exit(32)
+        raise InterpretError(32)
 
     return prefix, suffix
 
@@ -193,35 +652,42 @@ def editVar(var):
 """
 
 def changeString(str):
-    out = ""            # stores output string
-    isEscape = False    # for escape sequences
-    escVal = ""         # temp var for escape sequences
-
-    for i in str:
-        if isEscape is True:    # escape sequence
-            escVal += i
-            if len(escVal) == 3:    # escape sequence of 3 chars was loaded
-                out += chr(int(escVal))     # converting
-                escVal = ""
-                isEscape = False
-        # handling for non-escaped chars
-        else:
-            if i != "\\":
-                out += i
-            else:
-                isEscape = True
-
-    return out
+    if "\\" not in str:
+        return str
+    parts = ESCAPE.split(str)
+    # every backslash starts escape sequence of 3 digits
+    if len(parts) // 2 == str.count("\\"):
+        parts[1::2] = map(ESCAPES.__getitem__, parts[1::2])
+        return "".join(parts)
+
+    # escape sequence is backslash and any 3 following chars
+    parts = str.split("\\")
+    out = [parts[0]]
+    for i in range(1, len(parts)):
+        escVal = parts[i][:3]
+        if len(escVal) < 3:
+            # backslash inside of escape sequence, sequence can't be converted
+            if len("\\".join(parts[i:])) >= 3:
+                raise ValueError
+            break   # incomplete sequence at the end is left out
+        out.append(ESCAPES[escVal] if escVal in ESCAPES else chr(int(escVal)))
+        out.append(parts[i][3:])
+    return "".join(out)
+
+
+# escape sequences of 3 decimal digits
+ESCAPE = re.compile(r"\\([0-9]{3})")
+# decoded escape sequences \000 - \999
+ESCAPES = {"%03d" % code: chr(code) for code in range(1000)}
+# chars which can't be in string literal
+FORBIDDEN_CHARS = re.compile("[\n \t\v\f\r#]")
 
 
 """
     checks if operand is correct
 """
 
-def checkErr(var, expected1, expected2, *symb):
-    if var != 'var':
-        return 32
-
+def checkErr(expected1, expected2, *symb):
     if expected2 is None:
         if symb[0] != expected1:
             return 53
@@ -235,1953 +701,2006 @@ def checkErr(var, expected1, expected2, *symb):
 
 
 """
-    checks if prefix and suffix are initialized in hashTable
+    type of value nil@nil, NIL is its only instance, unpickled program
+    (cache) refers to the same instance, but values are compared with nil
+    by their type, so it doesn't depend on it
 """
 
-def inTable(pref, suf):
-    if pref not in hashTable:
-        return 55
-    if suf not in hashTable[pref]:
-        return 54
-    return 0
+class Nil:
+    def __repr__(self):
+        return "nil"
+
+    def __eq__(self, other):
+        return type(other) is Nil
+
+    def __hash__(self):
+        return 0
+
+    def __reduce__(self):
+        return "NIL"
+
+
+NIL = Nil()
 
 
 """
-    gets value from var which is in hashTable
+    string which can be changed in place, it's used for variables changed
+    by CONCAT (appending to itself) and SETCHAR, so loops building strings
+    aren't quadratic
+    buffer is never shared, value of variable is copied as str (see fromTable)
 """
 
-def fromTable(arg):
-    pref, suf = editVar(arg)
-    code = inTable(pref, suf)
-    if code != 0:
-        sys.exit(code)
-
-    result = hashTable[pref][suf]
-    if result is None:
-        sys.exit(56)
-    return result
-
-
-"""
-    function which imitates switch like in C
-"""
-
-def mySwitch(argument):
-    switcher = {"MOVE": move,
-                "CREATEFRAME": createframe,
-                "PUSHFRAME": pushframe,
-                "POPFRAME": popframe,
-                "DEFVAR": defvar,
-                "CALL": call,
-                "RETURN": returnInstr,
-                "PUSHS": pushs,
-                "POPS": pops,
-                "ADD": add,
-                "SUB": sub,
-                "MUL": mul,
-                "IDIV": idiv,
-                "LT": lt,
-                "GT": gt,
-                "EQ": eq,
-                "AND": andInstr,
-                "OR": orInstr,
-                "NOT": notInstr,
-                "INT2CHAR": int2char,
-                "STRI2INT": stri2int,
-                "READ": read,
-                "WRITE": write,
-                "CONCAT": concat,
-                "STRLEN": strlen,
-                "GETCHAR": getchar,
-                "SETCHAR": setchar,
-                "TYPE": typeInstr,
-                "EXIT": exitInstr,
-                "LABEL": label,
-                "DPRINT": dprint,
-                "JUMP": jump,
-                "JUMPIFEQ": jumpifeq,
-                "JUMPIFNEQ": jumpifneq,
-                "BREAK": breakInstr,
-                "ADDS": adds,
-                "SUBS": subs,
-                "MULS": muls,
-                "IDIVS": idivs,
-                "LTS": lts,
-                "GTS": gts,
-                "EQS": eqs,
-                "ANDS": ands,
-                "ORS": ors,
-                "NOTS": nots,
-                "INT2CHARS": int2chars,
-                "STRI2INTS": stri2ints,
-                "JUMPIFEQS": jumpifeqs,
-                "JUMPIFNEQS": jumpifneqs,
-                "CLEARS": clears,
-                "DIV": div,
-                "INT2FLOAT": int2float,
-                "FLOAT2INT": float2int,
-                "DIVS": divs,
-                "INT2FLOATS": int2floats,
-                "FLOAT2INTS": float2ints}
-    if argument[1][0] not in switcher:
-        sys.exit(32)
-    execs = switcher.get(argument[1][0], lambda: "Wrong instruction!\n")
-    return execs(argument[1])
-
-
-# MOVE ⟨var⟩ ⟨symb⟩
-def move(argument):
-    if (len(argument[1])) != 2:
-        sys.exit(32)
-
-    if (argument[1][0][0]) != 'var':
-        sys.exit(32)
-
-    if argument[1][1][0] != 'var':
-        if checkSymb(argument[1][1][0]) is False:
-            sys.exit(32)
-        else:
-            if argument[1][1][1] is None:
-                argument[1][1][1] = ""
-                var = (argument[1][1][0], argument[1][1][1])
-            else:
-                var = (argument[1][1][0], argument[1][1][1])
-    else:
-        var = fromTable(argument[1][1][1])
-
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
-
-    hashTable[destPrefix][destSuffix] = var
-
-
-# CREATEFRAME
-def createframe(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-    hashTable["TF"] = {}
-
-
-# PUSHFRAME
-def pushframe(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-    if "TF" not in hashTable:
-        sys.exit(55)
-    if "LF" in hashTable:
-        stackOfFrames.append(hashTable["LF"])  # appending frame to stack
-    hashTable["LF"] = hashTable.pop("TF")  # frame TF is replaced by LF
-
-
-# POPFRAME
-def popframe(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-    if "LF" not in hashTable:
-        sys.exit(55)
-    hashTable["TF"] = hashTable.pop("LF")
-    if len(stackOfFrames) >= 1:
-        hashTable["LF"] = stackOfFrames.pop()
-
-
-# DEFVAR ⟨var⟩
-def defvar(argument):
-    if (len(argument[1])) != 1:
-        sys.exit(32)
-
-    if (argument[1][0][0]) != 'var':
-        sys.exit(32)
-    pref, suf = editVar(argument[1][0][1])
-    if pref not in hashTable:
-        sys.exit(55)
-    if suf in hashTable[pref] and len(hashTable["label"]) != 0:
-        return
-    if suf in hashTable[pref]:
-        sys.exit(52)
-    else:
-        hashTable[pref][suf] = None
+class StringBuffer:
+    __slots__ = ("chars", "text")
 
+    def __init__(self, text):
+        self.chars = list(text)
+        self.text = text        # cached str, None if chars were changed
 
-# CALL ⟨label⟩
-def call(argument):
-    global instrPointer
-    if (len(argument[1])) != 1:
-        sys.exit(32)
+    def __str__(self):
+        if self.text is None:
+            self.text = "".join(self.chars)
+        return self.text
 
-    if argument[1][0][0] != 'label':
-        sys.exit(32)
+    def __len__(self):
+        return len(self.chars)
 
-    if argument[1][0][1] not in hashTable["label"]:
-        sys.exit(52)
+    def __getitem__(self, index):
+        return self.chars[index]
 
-    stackOfCalls.append(instrPointer + 1)
-    instrPointer = hashTable["label"][argument[1][0][1]]
+    def append(self, text):
+        self.chars.extend(text)
+        self.text = None
 
+    def setChar(self, index, char):
+        self.chars[index] = char
+        self.text = None
 
-# RETURN
-def returnInstr(argument):
-    global instrPointer
-    if len(argument[1]) > 0:
-        sys.exit(32)
 
-    if len(stackOfCalls) != 0:
-        instrPointer = stackOfCalls.pop()
-    else:
-        sys.exit(56)
+# values are stored as python objects, type in IPPcode20 is given by python type
+TYPE_NAMES = {int: 'int', float: 'float', bool: 'bool', str: 'string', Nil: 'nil',
+              StringBuffer: 'string'}
 
 
-# ADD ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def add(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+"""
+    returns IPPcode20 type of value
+"""
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+def typeOf(value):
+    return TYPE_NAMES[type(value)]
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
 
-    if argument[1][1][0] == 'float' or argument[1][2][0] == 'float':
-        exp = 'float'
-    else:
-        exp = 'int'
-    code = checkErr(argument[1][0][0], exp, exp, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+"""
+    converts value to its text form in IPPcode20
+"""
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+def toText(value):
+    if type(value) is bool:
+        return 'true' if value else 'false'
+    if type(value) is float:
+        return value.hex()
+    return str(value)
 
-    try:
-        if exp == 'float':
-            result = float(float.fromhex(argument[1][1][1])) + float(float.fromhex(argument[1][2][1]))
-            result = float.hex(result)
-            hashTable[destPrefix][destSuffix] = ('float', str(result))
-        else:
-            result = int(argument[1][1][1]) + int(argument[1][2][1])
-            hashTable[destPrefix][destSuffix] = ('int', str(result))
-    except:
-        sys.exit(32)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+"""
+    converts literal from XML (escape sequences are already replaced)
+    to python value, var, label and type stay as text
+    raises ValueError if literal is not correct
+"""
 
+def decodeLiteral(argType, text):
+    if argType == 'string':
+        return "" if text is None else text
+    if argType == 'int':
+        return int(text or "")
+    if argType == 'float':
+        try:
+            return float.fromhex(text or "")
+        except ValueError:
+            return float(text or "")
+    if argType == 'bool':
+        if text != 'true' and text != 'false':
+            raise ValueError
+        return text == 'true'
+    if argType == 'nil':
+        if text != 'nil':
+            raise ValueError
+        return NIL
+    return text
 
-# SUB ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def sub(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+"""
+    error of interpretation, code is exit code of the interpret
+"""
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+class InterpretError(Exception):
+    def __init__(self, code):
+        super().__init__("interpretation failed with exit code %d" % code)
+        self.code = code
 
-    if argument[1][1][0] == 'float' or argument[1][2][0] == 'float':
-        exp = 'float'
-    else:
-        exp = 'int'
 
-    code = checkErr(argument[1][0][0], exp, exp, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+"""
+    end of the program by instruction EXIT, code is its operand
+"""
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
-    try:
-        if exp == 'float':
-            result = float(float.fromhex(argument[1][1][1])) - float(float.fromhex(argument[1][2][1]))
-            result = float.hex(result)
-            hashTable[destPrefix][destSuffix] = ('float', str(result))
-        else:
-            result = int(argument[1][1][1]) - int(argument[1][2][1])
-            hashTable[destPrefix][destSuffix] = ('int', str(result))
-    except:
-        sys.exit(32)
+class ProgramExit(InterpretError):
+    pass
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
 
+"""
+    run was stopped, because it exceeded its limit ('insts' or 'memory')
+"""
 
-# MUL ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def mul(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+class LimitExceeded(InterpretError):
+    def __init__(self, limit):
+        super().__init__(INTERNAL_ERROR)
+        self.limit = limit
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+"""
+    returns handler which sets instrPointer to index before calling handler,
+    it's used for instructions which need their position (CALL and BREAK),
+    because execution loop keeps instruction pointer in local variable
+"""
 
-    if argument[1][1][0] == 'float' or argument[1][2][0] == 'float':
-        exp = 'float'
-    else:
-        exp = 'int'
+def withPointer(handler, index):
+    def setPointer(interpreter, instruction):
+        interpreter.instrPointer = index
+        return handler(interpreter, instruction)
+    return setPointer
 
-    code = checkErr(argument[1][0][0], exp, exp, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+"""
+    interpret of one loaded program, program is shared and never changed,
+    so it can be run many times (f.e. with different inputs)
+    all state of the execution is kept in attributes and is created again
+    by every run, errors are raised as InterpretError
+"""
 
-    try:
-        if exp == 'float':
-            result = float(float.fromhex(argument[1][1][1])) * float(float.fromhex(argument[1][2][1]))
-            result = float.hex(result)
-            hashTable[destPrefix][destSuffix] = ('float', str(result))
+class Interpreter:
+    def __init__(self, instr, labels, names):
+        self.instr = instr
+        self.labels = labels
+        self.varNames = names
+        self.code = self.linkHandlers(instr)
+        self.reset(None, None, None, None, (), None, None)
+
+    """
+        returns pairs of handler and instruction in order of the program, so
+        execution doesn't look up handler of every executed instruction
+    """
+
+    def linkHandlers(self, instr):
+        code = list()
+        for index, (order, instruction) in enumerate(instr):
+            handler = self.HANDLERS[instruction[0]]
+            if instruction[0] in POINTER_OPCODES:
+                handler = withPointer(handler, index)
+            code.append((handler, instruction))
+        return tuple(code)
+
+    """
+        creates state of a new execution of the program
+    """
+
+    def reset(self, inputFile, outputFile, errorFile, statsFile, statsOptions, profileFile, instrLimit):
+        self.frames = [self.newFrame(GF), None, None]  # GF, LF, TF, every frame is list of variables
+        self.definedVars = [0, 0, 0]        # number of defined variables in GF, LF, TF
+        self.stackOfFrames = list()         # (frame, number of its defined variables)
+        self.stackOfVars = list()
+        self.stackOfCalls = list()
+        self.instrPointer, self.varCounter, self.instrCounter = 0, 0, 0
+        self.execCounts = list()            # number of executions of every instruction
+        self.hotCount, self.hotOrder = 0, None  # most executed instruction
+        self.maxStack, self.maxCalls, self.maxFrames = 0, 0, 0
+        self.frequentOpcodes = ""           # most frequent opcodes in the program
+        self.statsFile = statsFile
+        self.statsOptions = statsOptions    # options of statistics in order of arguments
+        self.profileFile = profileFile
+        self.instrLimit = instrLimit        # maximum number of executed instructions (None if unlimited)
+        self.outputFile = outputFile
+        self.outputBuffer = list()          # text written by WRITE, which wasn't flushed yet
+        self.outputSize = 0                 # length of text in outputBuffer
+        self.errorFile = errorFile          # output of DPRINT and BREAK
+        self.inputFile = inputFile
+        self.inputLines = list()            # lines of the last block of input
+        self.inputIndex = 0                 # index of next line in inputLines
+        self.inputRest = ""                 # unfinished last line of the block
+
+    """
+        executes the program with input read from inputFile and output written
+        to outputFile, statistics are written to statsFile (options of them
+        f.e. '--insts' are in statsOptions) and profile to profileFile
+        run is stopped by LimitExceeded after instrLimit instructions
+        returns exit code of the program (0 or operand of EXIT), error of
+        interpretation is raised as InterpretError
+    """
+
+    def run(self, inputFile, outputFile, errorFile=None, statsFile=None, statsOptions=(), profileFile=None,
+            instrLimit=None):
+        self.reset(inputFile, outputFile, sys.stderr if errorFile is None else errorFile,
+                   statsFile, statsOptions, profileFile, instrLimit)
+        if statsFile is not None or instrLimit is not None:
+            self.prepareStats(self.instr)
+
+        # output has to be written also when interpretation ends with error
+        try:
+            if profileFile is None:
+                self.execute(self.instr)
+            else:
+                self.executeProfiled(self.instr)
+            code = 0
+        except ProgramExit as exit:
+            code = exit.code
+        finally:
+            self.flushOutput()
+
+        # writing stats into the file
+        if statsFile is not None:
+            self.writeStats()
+        return code
+    """
+        returns type and value of symbol, value of variable is read from its frame
+        instruction itself is never changed, so program can be shared
+    """
+
+    def getSymb(self, arg):
+        if arg[0] == 'var':
+            return self.fromTable(arg[1])
+        return arg
+
+    """
+        same as getSymb, but string in variable is returned as it is stored
+        (it can be StringBuffer), only for instructions working with strings
+    """
+
+    def getString(self, arg):
+        if arg[0] == 'var':
+            return self.fromTable(arg[1], False)
+        return arg
+
+    """
+        checks if frame exists and variable in slot of frame is defined
+    """
+
+    def inTable(self, kind, slot):
+        if self.frames[kind] is None:
+            return 55
+        if self.frames[kind][slot] is UNDEFINED:
+            return 54
+        return 0
+
+    """
+        gets value from var, which is (kind of frame, slot)
+        StringBuffer is converted to str, unless copy is False
+    """
+
+    def fromTable(self, arg, copy=True):
+        frame = self.frames[arg[0]]
+        if frame is None:
+            raise InterpretError(55)
+
+        result = frame[arg[1]]
+        if result is UNDEFINED:
+            raise InterpretError(54)
+        if result is None:
+            raise InterpretError(56)
+        if copy and type(result) is StringBuffer:
+            return 'string', str(result)
+        return typeOf(result), result
+
+    """
+        converts frame of given kind to text, only for debug output
+    """
+
+    def frameToText(self, kind):
+        return str({name: None if value is None else (typeOf(value), toText(value))
+                    for name, value in zip(self.varNames[kind], self.frames[kind]) if value is not UNDEFINED})
+
+    """
+        creates new frame of given kind with all variables undefined
+    """
+
+    def newFrame(self, kind):
+        return [UNDEFINED] * len(self.varNames[kind])
+
+    """
+        writes text to the output, text is collected in outputBuffer
+        and written to outputFile in big chunks
+    """
+
+    def writeOutput(self, text):
+        self.outputBuffer.append(text)
+        self.outputSize += len(text)
+        if self.outputSize >= OUTPUT_BUFFER_SIZE:
+            self.flushOutput()
+
+    """
+        writes collected output to outputFile, it has to be called before
+        the program ends and before anything is written to errorFile
+    """
+
+    def flushOutput(self):
+        if len(self.outputBuffer) != 0:
+            self.outputFile.write("".join(self.outputBuffer))
+            self.outputBuffer.clear()
+            self.outputSize = 0
+        self.outputFile.flush()
+
+    """
+        returns next line of input without end of line, None at the end of input
+        input is read in big blocks which are split to lines,
+        terminal is read by lines, so user doesn't have to fill whole block
+    """
+
+    def readLine(self):
+        while self.inputIndex >= len(self.inputLines):
+            try:
+                if self.inputFile.isatty():
+                    block = self.inputFile.readline()
+                else:
+                    block = self.inputFile.read(INPUT_BLOCK_SIZE)
+            except (OSError, UnicodeDecodeError, ValueError):
+                block = ""
+            if block == "":
+                if self.inputRest == "":
+                    return None
+                self.inputLines, self.inputRest = [self.inputRest], ""
+            else:
+                self.inputLines = (self.inputRest + block).split("\n")
+                self.inputRest = self.inputLines.pop()
+            self.inputIndex = 0
+        self.inputIndex += 1
+        return self.inputLines[self.inputIndex - 1]
+
+    # MOVE ⟨var⟩ ⟨symb⟩
+    def move(self, argument):
+        var = self.getSymb(argument[1][1])[1]
+
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
+
+        self.frames[destFrame][destSlot] = var
+
+    # CREATEFRAME
+    def createframe(self, argument):
+        self.frames[TF] = self.newFrame(TF)
+        self.definedVars[TF] = 0
+
+    # PUSHFRAME
+    def pushframe(self, argument):
+        if self.frames[TF] is None:
+            raise InterpretError(55)
+        if self.frames[LF] is not None:
+            self.stackOfFrames.append((self.frames[LF], self.definedVars[LF]))  # appending frame to stack
+        self.frames[LF], self.frames[TF] = self.frames[TF], None  # frame TF is replaced by LF
+        self.definedVars[LF], self.definedVars[TF] = self.definedVars[TF], 0
+
+    # POPFRAME
+    def popframe(self, argument):
+        if self.frames[LF] is None:
+            raise InterpretError(55)
+        self.frames[TF], self.frames[LF] = self.frames[LF], None
+        self.definedVars[TF], self.definedVars[LF] = self.definedVars[LF], 0
+        if len(self.stackOfFrames) >= 1:
+            self.frames[LF], self.definedVars[LF] = self.stackOfFrames.pop()
+
+    # DEFVAR ⟨var⟩
+    def defvar(self, argument):
+        kind, slot = argument[1][0][1]
+        if self.frames[kind] is None:
+            raise InterpretError(55)
+        if self.frames[kind][slot] is not UNDEFINED and len(self.labels) != 0:
+            return
+        if self.frames[kind][slot] is not UNDEFINED:
+            raise InterpretError(52)
         else:
-            result = int(argument[1][1][1]) * int(argument[1][2][1])
-            hashTable[destPrefix][destSuffix] = ('int', str(result))
-    except:
-        sys.exit(32)
+            self.frames[kind][slot] = None
+            self.definedVars[kind] += 1
+
+    # CALL ⟨label⟩
+    def call(self, argument):
+        self.stackOfCalls.append(self.instrPointer)
+        return argument[1][0][1]
+
+    # RETURN
+    def returnInstr(self, argument):
+        if len(self.stackOfCalls) != 0:
+            return self.stackOfCalls.pop()
+        else:
+            raise InterpretError(56)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    # ADD ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def add(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
+        if symb1[0] == 'float' or symb2[0] == 'float':
+            exp = 'float'
+        else:
+            exp = 'int'
+        code = checkErr(exp, exp, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-# IDIV ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def idiv(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        self.frames[destFrame][destSlot] = symb1[1] + symb2[1]
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+    # SUB ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def sub(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    exp = 'int'
-    code = checkErr(argument[1][0][0], exp, exp, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+        if symb1[0] == 'float' or symb2[0] == 'float':
+            exp = 'float'
+        else:
+            exp = 'int'
+        code = checkErr(exp, exp, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if int(argument[1][2][1]) == 0:
-        sys.exit(57)
-    try:
-        result = int(argument[1][1][1]) // int(argument[1][2][1])
-        hashTable[destPrefix][destSuffix] = ('int', str(result))
-    except:
-        sys.exit(32)
+        self.frames[destFrame][destSlot] = symb1[1] - symb2[1]
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    # MUL ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def mul(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
+        if symb1[0] == 'float' or symb2[0] == 'float':
+            exp = 'float'
+        else:
+            exp = 'int'
+        code = checkErr(exp, exp, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-# DIV ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def div(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        self.frames[destFrame][destSlot] = symb1[1] * symb2[1]
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+    # IDIV ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def idiv(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    exp = 'float'
-    code = checkErr(argument[1][0][0], exp, exp, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+        exp = 'int'
+        code = checkErr(exp, exp, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
-    if float.fromhex(argument[1][2][1]) == 0:
-        sys.exit(57)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    try:
-        result = float(float.fromhex(argument[1][1][1])) / float(float.fromhex(argument[1][2][1]))
-        result = result.hex()
-        hashTable[destPrefix][destSuffix] = ('float', str(result))
-    except:
-        sys.exit(32)
+        if symb2[1] == 0:
+            raise InterpretError(57)
+        self.frames[destFrame][destSlot] = symb1[1] // symb2[1]
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    # DIV ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def div(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
+        exp = 'float'
+        code = checkErr(exp, exp, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-# LT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def lt(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+        if symb2[1] == 0:
+            raise InterpretError(57)
+        self.frames[destFrame][destSlot] = symb1[1] / symb2[1]
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+    # LT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def lt(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+        if symb1[0] == 'nil' or symb2[0] == 'nil':
+            raise InterpretError(53)
 
-    if (checkSymb(argument[1][1][0]) or checkSymb(argument[1][2][0])) is False:
-        sys.exit(53)
+        if symb1[0] != symb2[0]:
+            raise InterpretError(53)
 
-    if argument[1][1][0] == 'nil' or argument[1][2][0] == 'nil':
-        sys.exit(53)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] != argument[1][2][0]:
-        sys.exit(53)
+        self.frames[destFrame][destSlot] = symb1[1] < symb2[1]
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+    # GT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def gt(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    try:
-        if argument[1][1][0] == 'int':
-            result = int(argument[1][1][1]) < int(argument[1][2][1])
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-        elif argument[1][1][0] == 'string':
-            result = argument[1][1][1] < argument[1][2][1]
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-        elif argument[1][1][0] == 'bool':
-            if argument[1][1][1] == 'false' and argument[1][2][1] == 'true':
-                hashTable[destPrefix][destSuffix] = ('bool', 'true')
-            else:
-                hashTable[destPrefix][destSuffix] = ('bool', 'false')
-        elif argument[1][1][0] == 'float':
-            result = float(float.fromhex(argument[1][1][1])) < float(float.fromhex(argument[1][2][1]))
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-    except:
-        sys.exit(32)
+        if symb1[0] == 'nil' or symb2[0] == 'nil':
+            raise InterpretError(53)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+        if symb1[0] != symb2[0]:
+            raise InterpretError(53)
 
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-# GT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def gt(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        self.frames[destFrame][destSlot] = symb1[1] > symb2[1]
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+    # EQ ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def eq(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+        if symb1[0] == 'nil' or symb2[0] == 'nil':
+            self.frames[destFrame][destSlot] = symb1[0] == symb2[0]
+        elif symb1[0] != symb2[0]:
+            raise InterpretError(53)
+        else:
+            self.frames[destFrame][destSlot] = symb1[1] == symb2[1]
 
-    if (checkSymb(argument[1][1][0]) or checkSymb(argument[1][2][0])) is False:
-        sys.exit(53)
+    # AND ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def andInstr(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    if argument[1][1][0] == 'nil' or argument[1][2][0] == 'nil':
-        sys.exit(53)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] != argument[1][2][0]:
-        sys.exit(53)
+        if symb1[0] != 'bool' or symb2[0] != 'bool':
+            raise InterpretError(53)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        self.frames[destFrame][destSlot] = symb1[1] and symb2[1]
 
-    try:
-        if argument[1][1][0] == 'int':
-            result = int(argument[1][1][1]) > int(argument[1][2][1])
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-        elif argument[1][1][0] == 'string':
-            result = argument[1][1][1] > argument[1][2][1]
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-        elif argument[1][1][0] == 'bool':
-            if argument[1][1][1] == 'true' and argument[1][2][1] == 'false':
-                hashTable[destPrefix][destSuffix] = ('bool', 'true')
-            else:
-                hashTable[destPrefix][destSuffix] = ('bool', 'false')
-        elif argument[1][1][0] == 'float':
-            result = float(float.fromhex(argument[1][1][1])) > float(float.fromhex(argument[1][2][1]))
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-    except:
-        sys.exit(32)
+    # OR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def orInstr(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
+        if symb1[0] != 'bool' or symb2[0] != 'bool':
+            raise InterpretError(53)
 
-# EQ ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def eq(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        self.frames[destFrame][destSlot] = symb1[1] or symb2[1]
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+    # NOT ⟨var⟩ ⟨symb1⟩
+    def notInstr(self, argument):
+        symb = self.getSymb(argument[1][1])
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+        if symb[0] != 'bool':
+            raise InterpretError(53)
 
-    if (checkSymb(argument[1][1][0]) or checkSymb(argument[1][2][0])) is False:
-        sys.exit(53)
+        self.frames[destFrame][destSlot] = not symb[1]
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+    # INT2CHAR ⟨var⟩ ⟨symb⟩
+    def int2char(self, argument):
+        symb = self.getSymb(argument[1][1])
 
-    if argument[1][1][0] == 'nil' or argument[1][2][0] == 'nil':
-        if argument[1][1][1] == 'nil' and argument[1][2][1] == 'nil':
-            hashTable[destPrefix][destSuffix] = ('bool', 'true')
-        else:
-            hashTable[destPrefix][destSuffix] = ('bool', 'false')
-        return
+        exp = 'int'
+        exp2 = None
+        code = checkErr(exp, exp2, symb[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] != argument[1][2][0]:
-        sys.exit(53)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    try:
-        if argument[1][1][0] == 'int':
-            result = int(argument[1][1][1]) == int(argument[1][2][1])
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-        elif argument[1][1][0] == 'string':
-            result = argument[1][1][1] == argument[1][2][1]
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-        elif argument[1][1][0] == 'bool':
-            if argument[1][1][1] == 'true' and argument[1][2][1] == 'true' or \
-                    argument[1][1][1] == 'false' and argument[1][2][1] == 'false':
-                hashTable[destPrefix][destSuffix] = ('bool', 'true')
-            else:
-                hashTable[destPrefix][destSuffix] = ('bool', 'false')
-        elif argument[1][1][0] == 'float':
-            result = float(float.fromhex(argument[1][1][1])) == float(float.fromhex(argument[1][2][1]))
-            hashTable[destPrefix][destSuffix] = ('bool', str(result).lower())
-    except:
-        sys.exit(32)
+        try:
+            self.frames[destFrame][destSlot] = chr(symb[1])
+        except:
+            raise InterpretError(58)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    # STRI2INT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def stri2int(self, argument):
+        symb1 = self.getString(argument[1][1])
+        symb2 = self.getString(argument[1][2])
 
+        exp = 'string'
+        exp2 = 'int'
+        code = checkErr(exp, exp2, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-# AND ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def andInstr(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+        word = symb1[1]
+        index = symb2[1]
+        if index < 0 or index > len(word) - 1:
+            raise InterpretError(58)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        self.frames[destFrame][destSlot] = ord(word[index])
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+    # INT2FLOAT ⟨var⟩ ⟨symb⟩
+    def int2float(self, argument):
+        symb = self.getSymb(argument[1][1])
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        exp = 'int'
+        exp2 = None
+        code = checkErr(exp, exp2, symb[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] != 'bool' or argument[1][2][0] != 'bool':
-        sys.exit(53)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][1] == 'true' and argument[1][2][1] == 'true':
-        hashTable[destPrefix][destSuffix] = ('bool', 'true')
-    else:
-        hashTable[destPrefix][destSuffix] = ('bool', 'false')
+        try:
+            self.frames[destFrame][destSlot] = float(symb[1])
+        except OverflowError:
+            raise InterpretError(32)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    # FLOAT2INT ⟨var⟩ ⟨symb⟩
+    def float2int(self, argument):
+        symb = self.getSymb(argument[1][1])
 
+        exp = 'float'
+        exp2 = None
+        code = checkErr(exp, exp2, symb[0])
+        if code != 0:
+            raise InterpretError(code)
 
-# OR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def orInstr(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+        try:
+            self.frames[destFrame][destSlot] = int(symb[1])
+        except (OverflowError, ValueError):
+            raise InterpretError(32)
+
+    # READ ⟨var⟩ ⟨type⟩
+    def read(self, argument):
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        type = argument[1][1][1]
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+        result = self.readLine()
+        if result is None:
+            result = 'nil'
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        if type == 'int' or type == 'string' or type == 'bool' or type == 'float':
+            if type == 'int':
+                try:
+                    self.frames[destFrame][destSlot] = int(result)
+                except:
+                    self.frames[destFrame][destSlot] = NIL
+            elif type == 'string':
+                if result == 'nil':
+                    self.frames[destFrame][destSlot] = NIL
+                else:
+                    self.frames[destFrame][destSlot] = result
+            elif type == 'bool':
+                if result == "" or result == 'nil':
+                    self.frames[destFrame][destSlot] = NIL
+                else:
+                    self.frames[destFrame][destSlot] = result.lower() == 'true'
+            elif type == 'float':
+                try:
+                    self.frames[destFrame][destSlot] = float.fromhex(result)
+                except:
+                    self.frames[destFrame][destSlot] = NIL
+        else:
+            raise InterpretError(57)
 
-    if argument[1][1][0] != 'bool' or argument[1][2][0] != 'bool':
-        sys.exit(53)
+    # WRITE ⟨symb⟩
+    def write(self, argument):
+        symb = self.getSymb(argument[1][0])
 
-    if argument[1][1][1] == 'true' or argument[1][2][1] == 'true':
-        hashTable[destPrefix][destSuffix] = ('bool', 'true')
-    else:
-        hashTable[destPrefix][destSuffix] = ('bool', 'false')
+        if symb[0] != 'nil':
+            self.writeOutput(toText(symb[1]))
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    # CONCAT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def concat(self, argument):
+        symb1 = self.getString(argument[1][1])
+        symb2 = self.getString(argument[1][2])
 
+        exp = 'string'
+        code = checkErr(exp, exp, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-# NOT ⟨var⟩ ⟨symb1⟩
-def notInstr(argument):
-    if (len(argument[1])) != 2:
-        sys.exit(32)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
+
+        # appending to the variable itself changes its buffer in place
+        if argument[1][1] == argument[1][0]:
+            result = self.frames[destFrame][destSlot]
+            if type(result) is not StringBuffer:
+                result = StringBuffer(result)
+                self.frames[destFrame][destSlot] = result
+            result.append(str(symb2[1]))
+        else:
+            self.frames[destFrame][destSlot] = str(symb1[1]) + str(symb2[1])
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+    # STRLEN ⟨var⟩ ⟨symb1⟩
+    def strlen(self, argument):
+        symb = self.getString(argument[1][1])
 
-    tempArg1 = argument[1][1]
+        exp = 'string'
+        exp2 = None
+        code = checkErr(exp, exp2, symb[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        self.frames[destFrame][destSlot] = len(symb[1])
 
-    if argument[1][1][0] != 'bool':
-        sys.exit(53)
+    # GETCHAR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def getchar(self, argument):
+        symb1 = self.getString(argument[1][1])
+        symb2 = self.getString(argument[1][2])
 
-    if argument[1][1][1] == 'true':
-        hashTable[destPrefix][destSuffix] = ('bool', 'false')
-    else:
-        hashTable[destPrefix][destSuffix] = ('bool', 'true')
+        exp = 'string'
+        exp2 = 'int'
+        code = checkErr(exp, exp2, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
+        word = symb1[1]
+        index = symb2[1]
+        if index < 0 or index > len(word) - 1:
+            raise InterpretError(58)
 
-# INT2CHAR ⟨var⟩ ⟨symb1⟩
-def int2char(argument):
-    if (len(argument[1])) != 2:
-        sys.exit(32)
+        self.frames[destFrame][destSlot] = word[index]
 
-    tempArg1 = argument[1][1]
+    # SETCHAR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
+    def setchar(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
+        exp = 'int'
+        exp2 = 'string'
+        code = checkErr(exp, exp2, symb1[0], symb2[0])
+        if code != 0:
+            raise InterpretError(code)
 
-    exp = 'int'
-    exp2 = None
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0])
-    if code != 0:
-        sys.exit(code)
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
+
+        word = self.fromTable(argument[1][0][1], False)
+        if word[0] != 'string':
+            raise InterpretError(53)
+        index = symb1[1]
+        char = symb2[1]
+
+        if char == "":
+            raise InterpretError(58)
+        if index < 0 or index > len(word[1]) - 1:
+            raise InterpretError(58)
+
+        # character is changed in place
+        result = word[1]
+        if type(result) is not StringBuffer:
+            result = StringBuffer(result)
+            self.frames[destFrame][destSlot] = result
+        result.setChar(index, char[0])
+
+    # TYPE ⟨var⟩ ⟨symb⟩
+    def typeInstr(self, argument):
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
+
+        if argument[1][1][0] == 'var':
+            kind, slot = argument[1][1][1]
+            code = self.inTable(kind, slot)
+            if code != 0:
+                raise InterpretError(code)
+            result = self.frames[kind][slot]
+            if result is None:
+                result = ""
+            else:
+                result = typeOf(result)
+        else:
+            result = argument[1][1][0]
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        self.frames[destFrame][destSlot] = result
 
-    try:
-        hashTable[destPrefix][destSuffix] = ('string', chr(int(argument[1][1][1])))
-    except:
-        sys.exit(58)
+    # EXIT ⟨symb⟩
+    def exitInstr(self, argument):
+        symb = self.getSymb(argument[1][0])
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
+        if symb[0] != 'int':
+            raise InterpretError(53)
 
+        if 0 <= symb[1] <= 49:
+            raise ProgramExit(symb[1])
+        else:
+            raise InterpretError(57)
 
-# STRI2INT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def stri2int(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+    # pass because of createLabel
+    def label(self, argument):
+        return
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+    # JUMP ⟨label⟩
+    def jump(self, argument):
+        return argument[1][0][1]
+
+    # JUMPIFEQ ⟨label⟩ ⟨symb1⟩ ⟨symb2⟩
+    def jumpifeq(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
+
+        if symb1[0] == symb2[0]:
+            if symb1[1] == symb2[1]:
+                return argument[1][0][1]
+        elif symb1[0] != 'nil' and symb2[0] != 'nil':
+            raise InterpretError(53)
+
+    # JUMPIFNEQ ⟨label⟩ ⟨symb1⟩ ⟨symb2⟩
+    def jumpifneq(self, argument):
+        symb1 = self.getSymb(argument[1][1])
+        symb2 = self.getSymb(argument[1][2])
+
+        if symb1[0] == symb2[0]:
+            if symb1[1] != symb2[1]:
+                return argument[1][0][1]
+        elif symb1[0] == 'nil' or symb2[0] == 'nil':
+            return argument[1][0][1]
+        else:
+            raise InterpretError(53)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+    # DPRINT ⟨symb⟩
+    def dprint(self, argument):
+        symb = self.getSymb(argument[1][0])
 
-    exp = 'string'
-    exp2 = 'int'
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+        self.flushOutput()
+        self.errorFile.write(toText(symb[1]))
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
-    try:
-        word = argument[1][1][1]
-        index = int(argument[1][2][1])
-    except:
-        sys.exit(32)
+    # PUSHS ⟨symb⟩
+    def pushs(self, argument):
+        symb = self.getSymb(argument[1][0])
 
-    if int(index) < 0:
-        sys.exit(58)
+        self.stackOfVars.append(symb[1])
 
-    try:
-        result = word[int(index)]
-        hashTable[destPrefix][destSuffix] = ('int', ord(result))
-    except:
-        sys.exit(58)
-
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
-
-
-# INT2FLOAT ⟨var⟩ ⟨symb⟩
-def int2float(argument):
-    if len(argument[1]) != 2:
-        sys.exit(32)
-
-    tempArg1 = argument[1][1]
-
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-
-    exp = 'int'
-    exp2 = None
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0])
-    if code != 0:
-        sys.exit(code)
-
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
-
-    try:
-        result = float(int(argument[1][1][1])).hex()
-        hashTable[destPrefix][destSuffix] = ('float', result)
-    except:
-        sys.exit(32)
-
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-
-
-# FLOAT2INT ⟨var⟩ ⟨symb⟩
-def float2int(argument):
-    if len(argument[1]) != 2:
-        sys.exit(32)
-
-    tempArg1 = argument[1][1]
-
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-
-    exp = 'float'
-    exp2 = None
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0])
-    if code != 0:
-        sys.exit(code)
-
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+    # POPS ⟨var⟩
+    def pops(self, argument):
+        destFrame, destSlot = argument[1][0][1]
+        code = self.inTable(destFrame, destSlot)
+        if code != 0:
+            raise InterpretError(code)
 
-    try:
-        result = float.fromhex(argument[1][1][1])
-        hashTable[destPrefix][destSuffix] = ('int', int(result))
-    except:
-        sys.exit(32)
+        if len(self.stackOfVars) != 0:
+            self.frames[destFrame][destSlot] = self.stackOfVars.pop()
+        else:
+            raise InterpretError(56)
+
+    # BREAK
+    def breakInstr(self, argument):
+        self.flushOutput()
+        self.errorFile.write("Code is now processing instruction: " + str(self.instrPointer + 1) + '\n' +
+                         "Content in Global Frame: " + self.frameToText(GF) + '\n' +
+                         "Names of the defined labels and its index: " + str(self.labels) + '\n')
+        try:
+            if self.frames[TF] is not None:
+                self.errorFile.write("Content in Temporary Frame: " + self.frameToText(TF) + '\n')
+            if self.frames[LF] is not None:
+                self.errorFile.write("Content in Local Frame: " + self.frameToText(LF) + '\n')
+        except:
+            pass
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
+    ########################################################################
+    #                         ROZSIRENIE STACK                             #
+    ########################################################################
 
+    def adds(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-# READ ⟨var⟩ ⟨type⟩
-def read(argument):
-    if (len(argument[1])) != 2:
-        sys.exit(32)
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if (type2 != 'int' or type1 != 'int') and \
+                (type2 != 'float' or type1 != 'float'):
+            raise InterpretError(53)
 
-    exp = 'type'
-    exp2 = None
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0])
-    if code != 0:
-        sys.exit(code)
+        self.stackOfVars.append(var1 + var2)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
-
-    type = argument[1][1][1]
+    def subs(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    try:
-        result = input()
-    except:
-        if EOFError:
-            result = 'nil'
-        else:
-            result = ""
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if (type2 != 'int' or type1 != 'int') and \
+                (type2 != 'float' or type1 != 'float'):
+            raise InterpretError(53)
 
-    if type == 'int' or type == 'string' or type == 'bool' or type == 'float':
-        if type == 'int':
-            if result == "":
-                hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-            else:
-                try:
-                    hashTable[destPrefix][destSuffix] = ('int', str(int(result)))
-                except:
-                    hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-        elif type == 'string':
-            if result == "":
-                hashTable[destPrefix][destSuffix] = ('string', '')
-            elif result == 'nil':
-                hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-            else:
-                try:
-                    hashTable[destPrefix][destSuffix] = ('string', str(result))
-                except:
-                    hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-        elif type == 'bool':
-            if result == "" or result == 'nil':
-                hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-            else:
-                if str(result).lower() != 'true':
-                    hashTable[destPrefix][destSuffix] = ('bool', 'false')
-                else:
-                    hashTable[destPrefix][destSuffix] = ('bool', 'true')
-        elif type == 'float':
-            if result == "":
-                hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-            else:
-                try:
-                    hashTable[destPrefix][destSuffix] = ('float', str(float.fromhex(result).hex()))
-                except:
-                    hashTable[destPrefix][destSuffix] = ('nil', 'nil')
-    else:
-        sys.exit(57)
+        self.stackOfVars.append(var1 - var2)
 
+    def muls(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-# WRITE ⟨symb⟩
-def write(argument):
-    if (len(argument[1])) != 1:
-        sys.exit(32)
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if (type2 != 'int' or type1 != 'int') and \
+                (type2 != 'float' or type1 != 'float'):
+            raise InterpretError(53)
 
-    tempArg1 = argument[1][0]
+        self.stackOfVars.append(var1 * var2)
 
-    if argument[1][0][0] == 'var':
-        var = fromTable(argument[1][0][1])
-        argument[1][0] = var
+    def idivs(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    if checkSymb(argument[1][0][0]) is False:
-        sys.exit(53)
+        if typeOf(var2) != 'int' or typeOf(var1) != 'int':
+            raise InterpretError(53)
 
-    if argument[1][0][0] == 'nil':
-        print("", end='')
-    else:
-        if argument[1][0][0] == 'float':
-            try:
-                print(str(float.fromhex(argument[1][0][1]).hex()), end='')
-            except:
-                print(float(argument[1][0][1]).hex(), end='')
-        else:
-            print(argument[1][0][1], end='')
+        if var2 == 0:
+            raise InterpretError(57)
 
-    if tempArg1 != argument[1][0]:
-        argument[1][0] = tempArg1
+        self.stackOfVars.append(var1 // var2)
 
+    def divs(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-# CONCAT ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def concat(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        if typeOf(var2) != 'float' or typeOf(var1) != 'float':
+            raise InterpretError(53)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        if var2 == 0:
+            raise InterpretError(57)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+        self.stackOfVars.append(var1 / var2)
 
-    exp = 'string'
-    code = checkErr(argument[1][0][0], exp, exp, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+    def lts(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if type1 != type2:
+            raise InterpretError(53)
 
-    try:
-        hashTable[destPrefix][destSuffix] = ('string', str(argument[1][1][1] + argument[1][2][1]))
-    except:
-        sys.exit(32)
+        if type1 == 'nil':
+            raise InterpretError(53)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+        self.stackOfVars.append(var1 < var2)
 
+    def gts(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-# STRLEN ⟨var⟩ ⟨symb1⟩
-def strlen(argument):
-    if (len(argument[1])) != 2:
-        sys.exit(32)
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if type1 != type2:
+            raise InterpretError(53)
 
-    tempArg1 = argument[1][1]
+        if type1 == 'nil':
+            raise InterpretError(53)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
+        self.stackOfVars.append(var1 > var2)
 
-    exp = 'string'
-    exp2 = None
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0])
-    if code != 0:
-        sys.exit(code)
+    def eqs(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if type1 == 'nil' or type2 == 'nil':
+            self.stackOfVars.append(type1 == type2)
+            return
 
-    try:
-        hashTable[destPrefix][destSuffix] = ('int', int(len(argument[1][1][1])))
-    except:
-        sys.exit(32)
+        if type1 != type2:
+            raise InterpretError(53)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
+        self.stackOfVars.append(var1 == var2)
 
+    def ands(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-# GETCHAR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def getchar(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        if typeOf(var1) != 'bool' or typeOf(var2) != 'bool':
+            raise InterpretError(53)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+        self.stackOfVars.append(var1 and var2)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+    def ors(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    exp = 'string'
-    exp2 = 'int'
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+        if typeOf(var1) != 'bool' or typeOf(var2) != 'bool':
+            raise InterpretError(53)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        self.stackOfVars.append(var1 or var2)
 
-    try:
-        word = argument[1][1][1]
-        index = int(argument[1][2][1])
-    except:
-        sys.exit(32)
+    def nots(self, argument):
+        try:
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    if int(index) < 0 or int(index) > len(word) - 1:
-        sys.exit(58)
+        if typeOf(var1) != 'bool':
+            raise InterpretError(53)
 
-    hashTable[destPrefix][destSuffix] = ('string', str(word[int(index)]))
+        self.stackOfVars.append(not var1)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    def int2chars(self, argument):
+        try:
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
+        if typeOf(var1) != 'int':
+            raise InterpretError(53)
 
-# SETCHAR ⟨var⟩ ⟨symb1⟩ ⟨symb2⟩
-def setchar(argument):
-    if (len(argument[1])) != 3:
-        sys.exit(32)
+        try:
+            self.stackOfVars.append(chr(var1))
+        except:
+            raise InterpretError(58)
 
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
+    def stri2ints(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
+        if typeOf(var2) != 'int':
+            raise InterpretError(53)
 
-    exp = 'int'
-    exp2 = 'string'
-    code = checkErr(argument[1][0][0], exp, exp2, argument[1][1][0], argument[1][2][0])
-    if code != 0:
-        sys.exit(code)
+        if typeOf(var1) != 'string':
+            raise InterpretError(53)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        if var2 < 0 or var2 > len(var1) - 1:
+            raise InterpretError(58)
 
-    word = fromTable(argument[1][0][1])
-    if word[0] != 'string':
-        sys.exit(53)
-    try:
-        index = int(argument[1][1][1])
-        char = argument[1][2][1]
-    except:
-        sys.exit(32)
+        self.stackOfVars.append(ord(var1[var2]))
 
-    if char == "":
-        sys.exit(58)
-    if int(index) < 0 or int(index) > len(word[1]) - 1:
-        sys.exit(58)
+    def int2floats(self, argument):
+        try:
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    result = word[1]
-    result = result[:index] + char[0:1] + result[index + 1:]
+        if typeOf(var1) != 'int':
+            raise InterpretError(53)
 
-    hashTable[destPrefix][destSuffix] = ('string', str(result))
+        try:
+            self.stackOfVars.append(float(var1))
+        except OverflowError:
+            raise InterpretError(32)
 
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
+    def float2ints(self, argument):
+        try:
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
+        if typeOf(var1) != 'float':
+            raise InterpretError(53)
 
-# TYPE ⟨var⟩ ⟨symb⟩
-def typeInstr(argument):
-    if (len(argument[1])) != 2:
-        sys.exit(32)
+        try:
+            self.stackOfVars.append(int(var1))
+        except (OverflowError, ValueError):
+            raise InterpretError(32)
 
-    if argument[1][0][0] != 'var':
-        sys.exit(32)
+    def jumpifeqs(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
 
-    destPrefix, destSuffix = editVar(argument[1][0][1])
-    code = inTable(destPrefix, destSuffix)
-    if code != 0:
-        sys.exit(code)
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if type1 == type2:
+            if var1 == var2:
+                return argument[1][0][1]
+        elif type1 != 'nil' and type2 != 'nil':
+            raise InterpretError(53)
 
-    if argument[1][1][0] == 'var':
-        pref, suf = editVar(argument[1][1][1])
-        code = inTable(pref, suf)
-        if code != 0:
-            sys.exit(code)
-        result = hashTable[pref][suf]
-        if result is None:
-            result = ""
+    def jumpifneqs(self, argument):
+        try:
+            var2 = self.stackOfVars.pop()
+            var1 = self.stackOfVars.pop()
+        except:
+            raise InterpretError(56)
+
+        type1, type2 = typeOf(var1), typeOf(var2)
+        if type1 == type2:
+            if var1 != var2:
+                return argument[1][0][1]
+        elif type1 == 'nil' or type2 == 'nil':
+            return argument[1][0][1]
         else:
-            result = result[0]
-    else:
-        if checkSymb(argument[1][1][0]) is False:
-            sys.exit(53)
+            raise InterpretError(53)
+
+    def clears(self, argument):
+        self.stackOfVars.clear()
+
+    # unknown instruction
+    def unknownInstr(self, argument):
+        raise InterpretError(32)
+
+    # handlers of instructions, index is numeric opcode (order is the same as in OPCODES)
+    HANDLERS = (move, createframe, pushframe, popframe, defvar, call, returnInstr,
+                    pushs, pops, add, sub, mul, idiv, lt, gt, eq, andInstr, orInstr,
+                    notInstr, int2char, stri2int, read, write, concat, strlen, getchar,
+                    setchar, typeInstr, exitInstr, label, dprint, jump, jumpifeq,
+                    jumpifneq, breakInstr, adds, subs, muls, idivs, lts, gts, eqs, ands,
+                    ors, nots, int2chars, stri2ints, jumpifeqs, jumpifneqs, clears, div,
+                    int2float, float2int, divs, int2floats, float2ints, unknownInstr)
+
+    """
+        prepares statistics which are counted during execution of instr
+        and finds the most frequent opcodes in the program
+    """
+
+    def prepareStats(self, instr):
+        self.execCounts = [0] * len(instr)
+        occurrences = {}
+        for order, (opcode, args) in instr:
+            occurrences[opcode] = occurrences.get(opcode, 0) + 1
+        if len(occurrences) != 0:
+            most = max(occurrences.values())
+            self.frequentOpcodes = ",".join(sorted(OPCODES[opcode] for opcode, count in occurrences.items()
+                                                   if count == most))
+
+    """
+        writes statistics to statsFile in order given by statsOptions
+    """
+
+    def writeStats(self):
+        for argv in self.statsOptions:
+            if argv == '--insts':
+                self.statsFile.write(str(self.instrCounter) + '\n')
+            if argv == '--vars':
+                self.statsFile.write(str(self.varCounter) + '\n')
+            if argv == '--hot':
+                self.statsFile.write(("" if self.hotOrder is None else str(self.hotOrder)) + '\n')
+            if argv == '--frequent':
+                self.statsFile.write(self.frequentOpcodes + '\n')
+            if argv == '--stack':
+                self.statsFile.write(str(self.maxStack) + '\n')
+            if argv == '--calls':
+                self.statsFile.write(str(self.maxCalls) + '\n')
+            if argv == '--frames':
+                self.statsFile.write(str(self.maxFrames) + '\n')
+
+    """
+        executes instructions of the program, instruction pointer and counters
+        are kept in local variables, handlers of jumps return index of their
+        target and execution continues by the instruction after it
+    """
+
+    def execute(self, instr):
+        code = self.code
+        end = len(instr)
+        instrPointer = self.instrPointer
+        if self.statsFile is None and self.instrLimit is None:
+            while instrPointer < end:
+                handler, instruction = code[instrPointer]
+                target = handler(self, instruction)
+                instrPointer = (instrPointer if target is None else target) + 1
+            return
+
+        # instructions are counted only for statistics or limit
+        returnOpcode = OPCODE_INDEX["RETURN"]
+        limit = -1 if self.instrLimit is None else self.instrLimit + 1
+        executed = 0
+        execCounts, definedVars, frames = self.execCounts, self.definedVars, self.frames
+        stackOfVars, stackOfCalls, stackOfFrames = self.stackOfVars, self.stackOfCalls, self.stackOfFrames
+        instrCounter, varCounter, hotCount, hotOrder = self.instrCounter, self.varCounter, self.hotCount, self.hotOrder
+        maxStack, maxCalls, maxFrames = self.maxStack, self.maxCalls, self.maxFrames
+        try:
+            while instrPointer < end:
+                handler, instruction = code[instrPointer]
+                executed += 1
+                if executed == limit:
+                    raise LimitExceeded('insts')
+                instrCounter += 1
+                count = execCounts[instrPointer] + 1
+                execCounts[instrPointer] = count
+                if count > hotCount or (count == hotCount and instr[instrPointer][0] < hotOrder):
+                    hotCount, hotOrder = count, instr[instrPointer][0]
+                target = handler(self, instruction)
+
+                # RETURN isn't counted, jumps are counted twice (when they change the pointer)
+                if instruction[0] == returnOpcode:
+                    instrCounter += (target + 1 != instrPointer) - 1
+                elif target is not None:
+                    instrCounter += 1
+                instrPointer = (instrPointer if target is None else target) + 1
+
+                # counting variables and depths of stacks
+                counter = definedVars[GF] + definedVars[LF] + definedVars[TF]
+                if counter > varCounter:
+                    varCounter = counter
+                if len(stackOfVars) > maxStack:
+                    maxStack = len(stackOfVars)
+                if len(stackOfCalls) > maxCalls:
+                    maxCalls = len(stackOfCalls)
+                if len(stackOfFrames) + (frames[LF] is not None) > maxFrames:
+                    maxFrames = len(stackOfFrames) + (frames[LF] is not None)
+        finally:
+            self.instrCounter, self.varCounter = instrCounter, varCounter
+            self.hotCount, self.hotOrder = hotCount, hotOrder
+            self.maxStack, self.maxCalls, self.maxFrames = maxStack, maxCalls, maxFrames
+
+    """
+        same as execute, but number of executions and time spent in handler
+        are measured for every instruction, profile is written to profileFile
+        also when the program ends by EXIT or error
+    """
+
+    def executeProfiled(self, instr):
+        counts = [0] * len(instr)
+        times = [0.0] * len(instr)
+        clock = time.perf_counter
+        code = self.code
+        returnOpcode = OPCODE_INDEX["RETURN"]
+        # instructions are counted only for statistics or limit
+        counting = self.statsFile is not None or self.instrLimit is not None
+        limit = -1 if self.instrLimit is None else self.instrLimit + 1
+        executed = 0
+        end = len(instr)
+        instrPointer = self.instrPointer
+        try:
+            while instrPointer < end:
+                handler, instruction = code[instrPointer]
+                if counting:
+                    executed += 1
+                    if executed == limit:
+                        raise LimitExceeded('insts')
+                    self.instrCounter += 1
+                    count = self.execCounts[instrPointer] + 1
+                    self.execCounts[instrPointer] = count
+                    if count > self.hotCount or (count == self.hotCount and instr[instrPointer][0] < self.hotOrder):
+                        self.hotCount, self.hotOrder = count, instr[instrPointer][0]
+                counts[instrPointer] += 1
+                start = clock()
+                try:
+                    target = handler(self, instruction)
+                finally:
+                    # also instruction which ended the program (EXIT or error) gets its time
+                    times[instrPointer] += clock() - start
+
+                # RETURN isn't counted, jumps are counted twice (when they change the pointer)
+                if instruction[0] == returnOpcode:
+                    self.instrCounter += (target + 1 != instrPointer) - 1
+                elif target is not None:
+                    self.instrCounter += 1
+                instrPointer = (instrPointer if target is None else target) + 1
+
+                # counting variables and depths of stacks
+                if counting:
+                    counter = self.definedVars[GF] + self.definedVars[LF] + self.definedVars[TF]
+                    if counter > self.varCounter:
+                        self.varCounter = counter
+                    if len(self.stackOfVars) > self.maxStack:
+                        self.maxStack = len(self.stackOfVars)
+                    if len(self.stackOfCalls) > self.maxCalls:
+                        self.maxCalls = len(self.stackOfCalls)
+                    if len(self.stackOfFrames) + (self.frames[LF] is not None) > self.maxFrames:
+                        self.maxFrames = len(self.stackOfFrames) + (self.frames[LF] is not None)
+        finally:
+            self.writeProfile(instr, counts, times)
+
+    """
+        writes profile sorted by time to profileFile, per opcode and per order
+        of instruction, only executed instructions are included
+    """
+
+    def writeProfile(self, instr, counts, times):
+        opcodes = {}
+        orders = list()
+        for i in range(len(instr)):
+            if counts[i] == 0:
+                continue
+            name = OPCODES[instr[i][1][0]]
+            total = opcodes.setdefault(name, [0, 0.0])
+            total[0] += counts[i]
+            total[1] += times[i]
+            orders.append({"order": instr[i][0], "opcode": name, "count": counts[i], "time": times[i]})
+        opcodes = [{"opcode": name, "count": count, "time": spent} for name, (count, spent) in opcodes.items()]
+        opcodes.sort(key=lambda x: (-x["time"], -x["count"]))
+        orders.sort(key=lambda x: (-x["time"], -x["count"]))
+
+        if getattr(self.profileFile, "name", "").endswith(".json"):
+            json.dump({"opcodes": opcodes, "orders": orders}, self.profileFile, indent=1)
+            self.profileFile.write('\n')
         else:
-            result = argument[1][1][0]
-
-    hashTable[destPrefix][destSuffix] = ('string', str(result))
-
-
-# EXIT ⟨symb⟩
-def exitInstr(argument):
-    global statsFile
-    if (len(argument[1])) != 1:
-        sys.exit(32)
-
-    if argument[1][0][0] == 'var':
-        var = fromTable(argument[1][0][1])
-        argument[1][0] = var
-
-    if argument[1][0][0] != 'int':
-        sys.exit(53)
-
-    if 0 <= int(argument[1][0][1]) <= 49:
-        # if stats are included we have to write it out
-        if statsFile is not None:
-            for argv in sys.argv:
-                if argv == '--insts':
-                    statsFile.write(str(instrCounter) + '\n')
-                if argv == '--vars':
-                    statsFile.write(str(varCounter) + '\n')
-            statsFile.close()
-        sys.exit(int(argument[1][0][1]))
-    else:
-        sys.exit(57)
-
+            self.profileFile.write("%-12s %12s %14s\n" % ("opcode", "count", "time [s]"))
+            for item in opcodes:
+                self.profileFile.write("%-12s %12d %14.6f\n" % (item["opcode"], item["count"], item["time"]))
+            self.profileFile.write("\n%-8s %-12s %12s %14s\n" % ("order", "opcode", "count", "time [s]"))
+            for item in orders:
+                self.profileFile.write("%-8d %-12s %12d %14.6f\n"
+                                       % (item["order"], item["opcode"], item["count"], item["time"]))
 
 # this functions creates label before the interpretation of code
 # LABEL ⟨label⟩
-def createLabel(argument, index):
-    global instrPointer
-    if (len(argument[1][1])) != 1:
-        sys.exit(32)
-
-    if argument[1][1][0][0] != 'label':
-        sys.exit(32)
-
-    if argument[1][1][0][1] in hashTable["label"]:
-        sys.exit(52)
-    hashTable["label"][argument[1][1][0][1]] = index
-
+def createLabel(argument, index, labels):
+    if argument[1][1][0][1] in labels:
+        raise InterpretError(52)
+    labels[argument[1][1][0][1]] = index
 
-# pass because of createLabel
-def label(argument):
-    return
 
+# creates all labels of the program and links jumps to them, returns dict of labels
+def createLabels(instr):
+    labels = {}
+    for i in range(0, len(instr)):
+        if instr[i][1][0] == OPCODE_INDEX["LABEL"]:
+            createLabel(instr[i], i, labels)
+    linkLabels(instr, labels)
+    return labels
 
-# JUMP ⟨label⟩
-def jump(argument):
-    global instrPointer
-    if len(argument[1]) != 1:
-        sys.exit(32)
-
-    if argument[1][0][0] != 'label':
-        sys.exit(53)
-
-    if argument[1][0][1] not in hashTable["label"]:
-        sys.exit(52)
-
-    instrPointer = hashTable["label"][argument[1][0][1]]
-
-
-# JUMPIFEQ ⟨label⟩ ⟨symb1⟩ ⟨symb2⟩
-def jumpifeq(argument):
-    global instrPointer
-    if len(argument[1]) != 3:
-        sys.exit(32)
-
-    if argument[1][0][0] != 'label':
-        sys.exit(53)
-
-    if argument[1][0][1] not in hashTable["label"]:
-        sys.exit(52)
-
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
-
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
-
-    if str(argument[1][1][0]) == str(argument[1][2][0]):
-        if str(argument[1][1][1]) == str(argument[1][2][1]):
-            instrPointer = hashTable["label"][argument[1][0][1]]
-    elif str(argument[1][1][0]) == 'nil' or str(argument[1][2][0]) == 'nil':
-        if str(argument[1][1][0]) == 'nil' and str(argument[1][2][0]) == 'nil':
-            if str(argument[1][1][1]) == 'nil' and str(argument[1][2][1]) == 'nil':
-                instrPointer = hashTable["label"][argument[1][0][1]]
-    else:
-        sys.exit(53)
-
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
-
-
-# JUMPIFNEQ ⟨label⟩ ⟨symb1⟩ ⟨symb2⟩
-def jumpifneq(argument):
-    global instrPointer
-    if len(argument[1]) != 3:
-        sys.exit(32)
-
-    if argument[1][0][0] != 'label':
-        sys.exit(53)
-
-    if argument[1][0][1] not in hashTable["label"]:
-        sys.exit(52)
-
-    tempArg1 = argument[1][1]
-    tempArg2 = argument[1][2]
-
-    if argument[1][1][0] == 'var':
-        var = fromTable(argument[1][1][1])
-        argument[1][1] = var
-    if argument[1][2][0] == 'var':
-        var = fromTable(argument[1][2][1])
-        argument[1][2] = var
-
-    if str(argument[1][1][0]) == str(argument[1][2][0]):
-        if argument[1][1][1] != argument[1][2][1]:
-            instrPointer = hashTable["label"][argument[1][0][1]]
-    elif str(argument[1][1][0]) == 'nil' or str(argument[1][2][0]) == 'nil':
-        if str(argument[1][1][0]) == 'nil' and str(argument[1][2][0]) == 'nil':
-            if str(argument[1][1][1]) == "" and str(argument[1][2][1]) == "":
-                pass
-            else:
-                instrPointer = hashTable["label"][argument[1][0][1]]
-        else:
-            instrPointer = hashTable["label"][argument[1][0][1]]
-    else:
-        sys.exit(53)
-
-    if tempArg1 != argument[1][1]:
-        argument[1][1] = tempArg1
-    if tempArg2 != argument[1][2]:
-        argument[1][2] = tempArg2
-
-
-# DPRINT ⟨symb⟩
-def dprint(argument):
-    if (len(argument[1])) != 1:
-        sys.exit(32)
-
-    tempArg1 = argument[1][0]
-
-    if argument[1][0][0] == 'var':
-        var = fromTable(argument[1][0][1])
-        argument[1][0] = var
-
-    sys.stderr.write(str(argument[1][0][1]))
-
-    if tempArg1 != argument[1][0]:
-        argument[1][0] = tempArg1
-
-
-# PUSHS ⟨symb⟩
-def pushs(argument):
-    if (len(argument[1])) != 1:
-        sys.exit(32)
-
-    tempArg1 = argument[1][0]
-
-    if argument[1][0][0] == 'var':
-        pref, suf = editVar(argument[1][0][1])
-        code = inTable(pref, suf)
-        if code != 0:
-            sys.exit(code)
-        var = fromTable(argument[1][0][1])
-        argument[1][0] = var
-
-    if checkSymb(argument[1][0][0]) is False:
-        sys.exit(53)
-
-    stackOfVars.append((argument[1][0][0], argument[1][0][1]))
-
-    if tempArg1 != argument[1][0]:
-        argument[1][0] = tempArg1
-
-
-# POPS ⟨var⟩
-def pops(argument):
-    if (len(argument[1])) != 1:
-        sys.exit(32)
-
-    if argument[1][0][0] != 'var':
-        sys.exit(53)
-
-    destPref, destSuf = editVar(argument[1][0][1])
-    code = inTable(destPref, destSuf)
-    if code != 0:
-        sys.exit(code)
-
-    if len(stackOfVars) != 0:
-        hashTable[destPref][destSuf] = stackOfVars.pop()
-    else:
-        sys.exit(56)
-
-
-# BREAK
-def breakInstr(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-
-    sys.stderr.write("Code is now processing instruction: " + str(instrPointer + 1) + '\n' +
-                     "Content in Global Frame: " + str(hashTable["GF"]) + '\n' +
-                     "Names of the defined labels and its index: " + str(hashTable["label"]) + '\n')
-    try:
-        if "TF" in hashTable:
-            sys.stderr.write("Content in Temporary Frame: " + str(hashTable["TF"]) + '\n')
-        if "LF" in hashTable:
-            sys.stderr.write("Content in Local Frame: " + str(hashTable["LF"]) + '\n')
-    except:
-        pass
 
+# replaces label of every jump by index of its target, undefined label is error
+def linkLabels(instr, labels):
+    for order, (opcode, args) in instr:
+        if opcode in JUMP_OPCODES:
+            if args[0][1] not in labels:
+                raise InterpretError(52)
+            args[0] = ('label', labels[args[0][1]])
 
-############################################################################
-#                           ROZSIRENIE STACK                               #
-############################################################################
 
+# handlers of instructions, shared by all interprets
+HANDLERS = Interpreter.HANDLERS
 
-def adds(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
 
-    try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+# options of statistics
+STATS_OPTIONS = ("--insts", "--vars", "--hot", "--frequent", "--stack", "--calls", "--frames")
 
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if (var2[0] != 'int' or var1[0] != 'int') and \
-            (var2[0] != 'float' or var1[0] != 'float'):
-        sys.exit(53)
+"""
+    reads manifest of the batch, every line is source, input and expected
+    output and exit code of one program, separated by whitespace
+    only source is required, - is used for missing input or expected output,
+    empty lines and lines starting with # are skipped
+    relative paths are relative to the directory of the manifest
+    returns list of (source, input, expected output, expected exit code),
+    None is used for missing values
+"""
 
-    try:
-        if var1[0] == 'int':
-            result = int(var1[1]) + int(var2[1])
-            stackOfVars.append(('int', str(result)))
-        else:
-            result = float(float.fromhex(var1[1]) + float(float.fromhex(var2[1])))
-            result = float.hex(result)
-            stackOfVars.append(('float', str(result)))
-    except:
-        sys.exit(32)
+def readManifest(manifestFile):
+    baseDir = os.path.dirname(getattr(manifestFile, "name", ""))
+    programs = list()
+    for line in manifestFile:
+        fields = line.split()
+        if len(fields) == 0 or fields[0].startswith("#"):
+            continue
+        if len(fields) > 4:
+            sys.exit(11)
+        fields += ["-"] * (4 - len(fields))
+        paths = [None if field == "-" else os.path.join(baseDir, field) for field in fields[:3]]
+        try:
+            code = None if fields[3] == "-" else int(fields[3])
+        except ValueError:
+            sys.exit(11)
+        programs.append((paths[0], paths[1], paths[2], code))
+    return programs
 
 
-def subs(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
+"""
+    loads program for the batch, binary format is used for .ippc files
+    returns Interpreter or exit code if program can't be loaded
+"""
 
+def loadBatchProgram(source, cacheDir):
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+        if source.endswith(".ippc"):
+            with open(source, "rb") as sourceFile:
+                return Interpreter(*readBinary(sourceFile))
+        with open(source, "r") as sourceFile:
+            return Interpreter(*loadProgram(sourceFile, cacheDir))
+    except OSError:
+        return 11
+    except InterpretError as error:
+        return error.code
 
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if (var2[0] != 'int' or var1[0] != 'int') and \
-            (var2[0] != 'float' or var1[0] != 'float'):
-        sys.exit(53)
+"""
+    runs one program of the batch with fresh state, output and errors
+    are captured, nothing of the run is kept in interpreter after it ends
+    returns exit code, output and error output of the program
+"""
 
+def runBatchProgram(interpreter, inputPath):
+    outputFile, errorFile = io.StringIO(), io.StringIO()
     try:
-        if var1[0] == 'int':
-            result = int(var1[1]) - int(var2[1])
-            stackOfVars.append(('int', str(result)))
+        if inputPath is None:
+            inputFile = io.StringIO()
         else:
-            result = float(float.fromhex(var1[1]) - float(float.fromhex(var2[1])))
-            result = float.hex(result)
-            stackOfVars.append(('float', str(result)))
-    except:
-        sys.exit(32)
-
-
-def muls(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
-
+            inputFile = open(inputPath, "r")
+    except OSError:
+        return 11, "", ""
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+        code = interpreter.run(inputFile, outputFile, errorFile)
+    except InterpretError as error:
+        code = error.code
+    except Exception:
+        code = INTERNAL_ERROR
+    finally:
+        inputFile.close()
+    return code, outputFile.getvalue(), errorFile.getvalue()
 
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if (var2[0] != 'int' or var1[0] != 'int') and \
-            (var2[0] != 'float' or var1[0] != 'float'):
-        sys.exit(53)
+"""
+    runs all programs from the manifest in this process, recently used
+    programs are kept loaded (at most SERVICE_CACHE_SIZE, least recently
+    used is removed), but every run starts with fresh frames, stacks
+    and input, so programs can't affect each other
+    result of every program is written to resultsFile as one JSON line
+    (in order of the manifest), passed is null if nothing is expected
+"""
 
-    try:
-        if var1[0] == 'int':
-            result = int(var1[1]) * int(var2[1])
-            stackOfVars.append(('int', str(result)))
+def runBatch(manifestFile, resultsFile, cacheDir):
+    loaded = {}     # source -> Interpreter or exit code, in order of use
+    for source, inputPath, expectedPath, expectedCode in readManifest(manifestFile):
+        interpreter = loaded.pop(source, None)
+        if interpreter is None:
+            interpreter = loadBatchProgram(source, cacheDir)
+            if len(loaded) >= SERVICE_CACHE_SIZE:
+                del loaded[next(iter(loaded))]
+        loaded[source] = interpreter
+        if type(interpreter) is int:
+            code, output, errors = interpreter, "", ""
         else:
-            result = float(float.fromhex(var1[1]) * float(float.fromhex(var2[1])))
-            result = float.hex(result)
-            stackOfVars.append(('float', str(result)))
-    except:
-        sys.exit(32)
-
-
-def idivs(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
-
-    try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var2[0] != 'int' or var1[0] != 'int':
-        sys.exit(53)
-
-    if int(var2[1]) == 0:
-        sys.exit(57)
-
-    try:
-        result = int(var1[1]) // int(var2[1])
-        stackOfVars.append(('int', str(result)))
-    except:
-        sys.exit(32)
-
-
-def divs(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
-
-    try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var2[0] != 'float' or var1[0] != 'float':
-        sys.exit(53)
-
-    if float.fromhex(var2[1]) == 0:
-        sys.exit(57)
-
-    try:
-        result = float(float.fromhex(var1[1])) / float(float.fromhex(var2[1]))
-        result = result.hex()
-        stackOfVars.append(('float', str(result)))
-    except:
-        sys.exit(32)
-
-
-def lts(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-
-    try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+            code, output, errors = runBatchProgram(interpreter, inputPath)
 
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
+        # output is compared only if program ended successfully
+        passed = None
+        if expectedPath is not None or expectedCode is not None:
+            passed = code == (expectedCode or 0)
+            if passed and code == 0 and expectedPath is not None:
+                try:
+                    with open(expectedPath, "r") as expectedFile:
+                        passed = expectedFile.read() == output
+                except OSError:
+                    passed = False
+        resultsFile.write(json.dumps({"source": source, "input": inputPath, "code": code, "output": output,
+                                      "errors": errors, "passed": passed}) + '\n')
+    resultsFile.flush()
+    return 0
 
-    if var1[0] != var2[0]:
-        sys.exit(53)
 
-    if var1[0] == 'nil' or var2[0] == 'nil':
-        sys.exit(53)
+"""
+    returns number of cores which this process can use
+"""
 
-    try:
-        if var1[0] == 'int' and var2[0] == 'int':
-            result = int(var1[1]) < int(var2[1])
-            stackOfVars.append(('bool', str(result).lower()))
-        elif var1[0] == 'string' and var2[0] == 'string':
-            result = str(var1[1]) < str(var2[1])
-            stackOfVars.append(('bool', str(result).lower()))
-        elif var1[0] == 'bool' and var2[0] == 'bool':
-            if var1[1] == 'false' and var2[1] == 'true':
-                stackOfVars.append(('bool', 'true'))
-            else:
-                stackOfVars.append(('bool', 'false'))
-        elif var1[0] == 'float' and var2[0] == 'float':
-            result = float(float.fromhex(var1[1])) < float(float.fromhex(var2[1]))
-            stackOfVars.append(('bool', str(result).lower()))
-    except:
-        sys.exit(32)
+def availableCores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
 
-def gts(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
+"""
+    runs the program in the child process for one input, result is written
+    as JSON to resultPath, child ends without cleanup of the parent
+"""
 
+def runWorker(interpreter, inputPath, resultPath):
+    code = INTERNAL_ERROR
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
+        code, output, errors = runBatchProgram(interpreter, inputPath)
+        with open(resultPath, "w") as resultFile:
+            json.dump({"code": code, "output": output, "errors": errors}, resultFile)
+        code = 0
+    finally:
+        os._exit(code)
 
-    if var1[0] != var2[0]:
-        sys.exit(53)
 
-    if var1[0] == 'nil' or var2[0] == 'nil':
-        sys.exit(53)
-
-    try:
-        if var1[0] == 'int' and var2[0] == 'int':
-            result = int(var1[1]) > int(var2[1])
-            stackOfVars.append(('bool', str(result).lower()))
-        elif var1[0] == 'string' and var2[0] == 'string':
-            result = str(var1[1]) > str(var2[1])
-            stackOfVars.append(('bool', str(result).lower()))
-        elif var1[0] == 'bool' and var2[0] == 'bool':
-            if var1[1] == 'true' and var2[1] == 'false':
-                stackOfVars.append(('bool', 'true'))
-            else:
-                stackOfVars.append(('bool', 'false'))
-        elif var1[0] == 'float' and var2[0] == 'float':
-            result = float(float.fromhex(var1[1])) > float(float.fromhex(var2[1]))
-            stackOfVars.append(('bool', str(result).lower()))
-    except:
-        sys.exit(32)
+"""
+    runs loaded program for every input in its own forked process, at most
+    jobs processes run at once, decoded program is loaded only once and
+    its pages are shared by children (copy on write)
+    results are written to resultsFile as JSON lines in order of inputs
+"""
 
+def runForked(interpreter, inputPaths, resultsFile, jobs):
+    import tempfile
+    if not hasattr(os, "fork"):
+        jobs = 0    # processes can't be forked, inputs are run one by one
+    # objects of the program are never collected, so collector of children
+    # doesn't write to their pages and they stay shared
+    gc.freeze()
+    results = [None] * len(inputPaths)
+    with tempfile.TemporaryDirectory() as tempDir:
+        running = {}    # pid -> index of input
+        nextInput = 0
+        while nextInput < len(inputPaths) or len(running) != 0:
+            if jobs == 0:
+                results[nextInput] = runBatchProgram(interpreter, inputPaths[nextInput])
+                nextInput += 1
+                continue
+            if nextInput < len(inputPaths) and len(running) < jobs:
+                resultsFile.flush()     # buffer would be written also by the child
+                pid = os.fork()
+                if pid == 0:
+                    runWorker(interpreter, inputPaths[nextInput], os.path.join(tempDir, str(nextInput)))
+                running[pid] = nextInput
+                nextInput += 1
+                continue
+
+            pid, status = os.wait()
+            index = running.pop(pid)
+            try:
+                with open(os.path.join(tempDir, str(index)), "r") as resultFile:
+                    result = json.load(resultFile)
+                results[index] = (result["code"], result["output"], result["errors"])
+            except (OSError, ValueError):
+                results[index] = (INTERNAL_ERROR, "", "")   # child was killed
+
+    for inputPath, (code, output, errors) in zip(inputPaths, results):
+        resultsFile.write(json.dumps({"input": inputPath, "code": code, "output": output,
+                                      "errors": errors}) + '\n')
+    resultsFile.flush()
+    return 0
 
-def eqs(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
 
-    try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var1[0] == 'nil' or var2[0] == 'nil':
-        if var1[1] == 'nil' and var2[1] == 'nil':
-            stackOfVars.append(('bool', 'true'))
-        else:
-            stackOfVars.append(('bool', 'false'))
-        return
+"""
+    returns size of address space of this process in bytes, None if it's unknown
+"""
 
-    if var1[0] != var2[0]:
-        sys.exit(53)
+def addressSpace():
     try:
-        if var1[0] == 'int' and var2[0] == 'int':
-            result = int(var1[1]) == int(var2[1])
-            stackOfVars.append(('bool', str(result).lower()))
-        elif var1[0] == 'string' and var2[0] == 'string':
-            result = str(var1[1]) == str(var2[1])
-            stackOfVars.append(('bool', str(result).lower()))
-        elif var1[0] == 'bool' and var2[0] == 'bool':
-            if var1[1] == var2[1]:
-                stackOfVars.append(('bool', 'true'))
-            else:
-                stackOfVars.append(('bool', 'false'))
-        elif var1[0] == 'float' and var2[0] == 'float':
-            result = float(float.fromhex(var1[1])) == float(float.fromhex(var2[1]))
-            stackOfVars.append(('bool', str(result).lower()))
-    except:
-        sys.exit(32)
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
 
 
-def ands(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
+"""
+    executes one job of the service, job is JSON object with source (XML
+    code), input (text), id (copied to the response) and optional limits
+    maxInsts (executed instructions) and maxMemory (bytes which can be
+    allocated by the run, negative limits are invalid), decoded programs are
+    kept in cache of the worker under hash of their source, least recently
+    used program is removed
+    returns response - id, code, output, errors and exceeded limit (or None)
+"""
 
+def serveJob(line, cache):
+    response = {"id": None, "code": 0, "output": "", "errors": "", "limit": None}
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var1[0] != 'bool' or var2[0] != 'bool':
-        sys.exit(53)
-
-    if var1[1] == 'true' and var2[1] == 'true':
-        stackOfVars.append(('bool', 'true'))
-    else:
-        stackOfVars.append(('bool', 'false'))
-
-
-def ors(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-
+        job = json.loads(line)
+        response["id"] = job.get("id")
+        source, inputText = job["source"], job.get("input", "")
+        instrLimit, memoryLimit = job.get("maxInsts"), job.get("maxMemory")
+        if type(source) is not str or type(inputText) is not str or \
+                type(instrLimit) not in (int, type(None)) or type(memoryLimit) not in (int, type(None)):
+            raise ValueError
+        if (instrLimit is not None and instrLimit < 0) or (memoryLimit is not None and memoryLimit < 0):
+            raise ValueError
+    except (ValueError, KeyError, AttributeError):
+        response["code"] = 10
+        return response
+
+    key = hashlib.sha256((CACHE_VERSION + source).encode("utf-8")).hexdigest()
+    interpreter = cache.pop(key, None)
+    if interpreter is None:
+        try:
+            interpreter = Interpreter(*loadProgram(io.StringIO(source), None))
+        except InterpretError as error:
+            response["code"] = error.code
+            return response
+        if len(cache) >= SERVICE_CACHE_SIZE:
+            del cache[next(iter(cache))]
+    cache[key] = interpreter
+
+    # memory is limited by size of address space of the worker
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var1[0] != 'bool' or var2[0] != 'bool':
-        sys.exit(53)
-
-    if var1[1] == 'true' or var2[1] == 'true':
-        stackOfVars.append(('bool', 'true'))
-    else:
-        stackOfVars.append(('bool', 'false'))
-
-
-def nots(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
-
+        import resource
+    except ImportError:     # not available on Windows, memory of jobs isn't limited there
+        resource = None
+    limits = None
+    used = addressSpace()
+    if memoryLimit is not None and resource is not None and used is not None:
+        limits = resource.getrlimit(resource.RLIMIT_AS)
+        limit = used + memoryLimit
+        if limits[1] != resource.RLIM_INFINITY:
+            limit = min(limit, limits[1])
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limits[1]))
+
+    outputFile, errorFile = io.StringIO(), io.StringIO()
     try:
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+        response["code"] = interpreter.run(io.StringIO(inputText), outputFile, errorFile, instrLimit=instrLimit)
+    except LimitExceeded as error:
+        response["code"], response["limit"] = error.code, error.limit
+    except InterpretError as error:
+        response["code"] = error.code
+    except MemoryError:
+        response["code"], response["limit"] = INTERNAL_ERROR, 'memory'
+    except Exception:
+        response["code"] = INTERNAL_ERROR
+    finally:
+        if limits is not None:
+            resource.setrlimit(resource.RLIMIT_AS, limits)
+    response["output"], response["errors"] = outputFile.getvalue(), errorFile.getvalue()
+    return response
 
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if var1[0] != 'bool':
-        sys.exit(53)
+"""
+    worker process of the service, takes jobs (client, line) from jobs and
+    puts (client, response) to results until it gets None
+"""
 
-    if var1[1] == 'true':
-        stackOfVars.append(('bool', 'false'))
-    else:
-        stackOfVars.append(('bool', 'true'))
+def serviceWorker(jobs, results):
+    cache = {}      # hash of source -> Interpreter, in order of use
+    for client, line in iter(jobs.get, None):
+        results.put((client, serveJob(line, cache)))
 
 
-def int2chars(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
+"""
+    client of the service, responses are written to its outputFile
+    pending is number of its jobs which weren't answered yet
+"""
 
-    try:
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+class ServiceClient:
+    def __init__(self, outputFile):
+        import threading
+        self.outputFile = outputFile
+        self.pending = 0
+        self.condition = threading.Condition()
 
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if var1[0] != 'int':
-        sys.exit(53)
+"""
+    service executing jobs in pool of worker processes, workers are started
+    once and keep decoded programs, so a job doesn't pay for start of python
+    and parsing of known program, responses are in order of finished jobs
+"""
 
-    try:
-        stackOfVars.append(('string', chr(int(var1[1]))))
-    except:
-        sys.exit(58)
+class Service:
+    def __init__(self, workers):
+        import multiprocessing
+        import threading
+        context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+        self.jobs = context.Queue()
+        self.results = context.Queue()
+        self.workers = [context.Process(target=serviceWorker, args=(self.jobs, self.results), daemon=True)
+                        for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+        self.clients = {}       # number of client -> ServiceClient
+        self.nextClient = 0
+        self.lock = threading.Lock()
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    """
+        sends responses from workers to their clients
+    """
+
+    def dispatch(self):
+        for number, response in iter(self.results.get, None):
+            client = self.clients[number]
+            with client.condition:
+                try:
+                    client.outputFile.write(json.dumps(response) + '\n')
+                    client.outputFile.flush()
+                except (OSError, ValueError):
+                    pass    # client is gone, its remaining jobs are still finished
+                client.pending -= 1
+                client.condition.notify()
+
+    """
+        reads jobs of one client (one per line) until end of inputFile
+        and waits until all of them are answered
+    """
+
+    def serveClient(self, inputFile, outputFile):
+        client = ServiceClient(outputFile)
+        with self.lock:
+            number = self.nextClient
+            self.nextClient += 1
+            self.clients[number] = client
+        try:
+            for line in inputFile:
+                if line.strip() == "":
+                    continue
+                with client.condition:
+                    client.pending += 1
+                self.jobs.put((number, line))
+        except (OSError, ValueError):
+            pass    # connection was closed
+        with client.condition:
+            while client.pending != 0:
+                client.condition.wait()
+        with self.lock:
+            del self.clients[number]
+
+    """
+        stops workers and dispatcher
+    """
+
+    def close(self):
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.results.put(None)
+        self.dispatcher.join()
 
 
-def stri2ints(argument):
-    if (len(argument[1])) > 0:
-        sys.exit(32)
+"""
+    runs the service, jobs are read from stdin (responses are written to
+    stdout) if socketPath is -, otherwise from connections to Unix socket
+"""
 
+def serve(socketPath, workers):
+    import signal
+    import socketserver
+    if socketPath != "-" and not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        sys.exit(10)
+    service = Service(workers)
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
+        if socketPath == "-":
+            service.serveClient(sys.stdin, sys.stdout)
+            return 0
 
-    if var2[0] != 'int':
-        sys.exit(53)
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                with self.request.makefile("r", encoding="utf-8") as inputFile, \
+                        self.request.makefile("w", encoding="utf-8") as outputFile:
+                    service.serveClient(inputFile, outputFile)
 
-    if var1[0] != 'string':
-        sys.exit(53)
-
-    if int(var2[1]) < 0 or int(var2[1]) > len(var1[1]):
-        sys.exit(58)
-
-    try:
-        result = var1[1][int(var2[1])]
-        stackOfVars.append(('int', ord(result)))
-    except:
-        sys.exit(58)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(socketPath, Handler)
+        except OSError:
+            sys.exit(12)
+        server.daemon_threads = True
+        # service is stopped by SIGTERM or SIGINT
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.remove(socketPath)
+        return 0
+    finally:
+        service.close()
 
 
-def int2floats(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
+"""
+    returns key of memoized result - hash of the interpret, decoded
+    program, input and options of statistics
+"""
 
-    try:
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+def memoKey(program, inputText, statsOptions):
+    digest = hashlib.sha256(INTERPRET_HASH.encode())
+    # repr doesn't depend on how objects of the program are shared, so program
+    # loaded from XML and from the binary format has the same key
+    digest.update(repr(program).encode("utf-8", "surrogateescape"))
+    digest.update(("\0".join(statsOptions) + "\0").encode())
+    digest.update(inputText.encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()
 
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if var1[0] != 'int':
-        sys.exit(53)
+"""
+    returns memoized results in memoDir as list of (time of last use,
+    size, path), the least recently used first
+"""
 
+def listMemo(memoDir):
+    entries = list()
     try:
-        result = float(int(var1[1])).hex()
-        stackOfVars.append(('float', result))
-    except:
-        sys.exit(32)
+        names = os.listdir(memoDir)
+    except OSError:
+        return entries
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(memoDir, name)
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue    # removed by another interpret
+        entries.append((info.st_mtime, info.st_size, path))
+    entries.sort()
+    return entries
 
 
-def float2ints(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
+"""
+    removes all memoized results
+"""
 
-    try:
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
+def clearMemo(memoDir):
+    for _, _, path in listMemo(memoDir):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
 
-    if var1[0] != 'float':
-        sys.exit(53)
+"""
+    stores memoized result and removes the least recently used results,
+    so their size is at most memoSize, memo is only optimization, so errors
+    are ignored
+"""
 
+def storeMemo(memoDir, memoPath, memo, memoSize):
     try:
-        result = float.fromhex(var1[1])
-        stackOfVars.append(('int', int(result)))
-    except:
-        sys.exit(32)
+        os.makedirs(memoDir, exist_ok=True)
+        tempPath = memoPath + "." + str(os.getpid())
+        with open(tempPath, "w") as memoFile:
+            json.dump(memo, memoFile)
+        os.replace(tempPath, memoPath)
+    except OSError:
+        return
 
+    entries = listMemo(memoDir)
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= memoSize:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
 
-def jumpifeqs(argument):
-    global instrPointer
-    if (len(argument[1])) != 1:
-        sys.exit(32)
 
-    if argument[1][0][0] != 'label':
-        sys.exit(32)
-    if argument[1][0][1] not in hashTable["label"]:
-        sys.exit(52)
+"""
+    runs the program or replays its memoized result, programs are
+    deterministic, so result depends only on the decoded program, input
+    and options of statistics
+    output, error output, exit code and statistics of the run are memoized,
+    whole input is read before the run, because it's a part of the key
+"""
 
+def runMemoized(interpreter, program, inputFile, outputFile, statsFile, statsOptions, memoDir, memoSize):
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var1[0] == var2[0]:
-        if var1[1] == var2[1]:
-            instrPointer = hashTable["label"][argument[1][0][1]]
-    elif var1[0] == 'nil' or var2[0] == 'nil':
-        if var1[0] == 'nil' and var2[0] == 'nil':
-            if var1[1] == 'nil' and var2[1] == 'nil':
-                instrPointer = hashTable["label"][argument[1][0][1]]
-    else:
-        sys.exit(53)
-
-
-def jumpifneqs(argument):
-    global instrPointer
-    if (len(argument[1])) != 1:
-        sys.exit(32)
-
-    if argument[1][0][0] != 'label':
-        sys.exit(32)
-    if argument[1][0][1] not in hashTable["label"]:
-        sys.exit(52)
-
+        inputText = inputFile.read()
+    except (OSError, UnicodeDecodeError, ValueError):
+        inputText = ""      # READ also handles unreadable input as its end
+    memoPath = os.path.join(memoDir, memoKey(program, inputText, statsOptions) + ".json")
     try:
-        var2 = stackOfVars.pop()
-        var1 = stackOfVars.pop()
-    except:
-        sys.exit(56)
-
-    if var2[0] == 'var':
-        var = fromTable(var2[1])
-        var2[0] = var
-    if var1[0] == 'var':
-        var = fromTable(var1[1])
-        var1[0] = var
-
-    if var1[0] == var2[0]:
-        if var1[1] != var2[1]:
-            instrPointer = hashTable["label"][argument[1][0][1]]
-    elif var1[0] == 'nil' or var2[0] == 'nil':
-        if var1[0] == 'nil' and var2[0] == 'nil':
-            if var1[1] == 'nil' and var2[1] == 'nil':
-                pass
-            else:
-                instrPointer = hashTable["label"][argument[1][0][1]]
-        else:
-            instrPointer = hashTable["label"][argument[1][0][1]]
-    else:
-        sys.exit(53)
-
-
-def clears(argument):
-    if len(argument[1]) > 0:
-        sys.exit(32)
+        with open(memoPath, "r") as memoFile:
+            memo = json.load(memoFile)
+        os.utime(memoPath)  # time of the last use
+    except (OSError, ValueError):
+        memo = None
+
+    if memo is None:
+        runOutput, runErrors, runStats = io.StringIO(), io.StringIO(), io.StringIO()
+        try:
+            code = interpreter.run(io.StringIO(inputText), runOutput, runErrors,
+                                   None if statsFile is None else runStats, statsOptions)
+            failed = False
+        except InterpretError as error:
+            code, failed = error.code, True
+        memo = {"code": code, "failed": failed, "output": runOutput.getvalue(), "errors": runErrors.getvalue(),
+                "stats": runStats.getvalue()}
+        storeMemo(memoDir, memoPath, memo, memoSize)
+
+    outputFile.write(memo["output"])
+    outputFile.flush()
+    sys.stderr.write(memo["errors"])
+    # stats are written only by successful run
+    if statsFile is not None and not memo["failed"]:
+        statsFile.write(memo["stats"])
+    if memo["failed"]:
+        raise InterpretError(memo["code"])
+    return memo["code"]
 
-    for i in range(0, len(stackOfVars)):
-        stackOfVars.pop()
 
+"""
+    command line interface, errors are converted to exit codes
+"""
 
 def main():
-    global hashTable
-    global instrPointer
-    global instrCounter
-    global varCounter
-    sourceFile, inputFile, statsFile = argHandler()
-    sys.stdin = inputFile
-    instr = readSource(sourceFile)
-    hashTable["GF"] = {}
-    hashTable["label"] = {}
-    for i in range(0, len(instr)):
-        if instr[i][1][0] == 'LABEL':
-            createLabel(instr[i], i)
-
-    # execution of instructions
-    while instrPointer < len(instr):
-        instrPointerBefore = instrPointer
-        flag = False
-        if instr[instrPointer][1][0] == 'RETURN':
-            instrCounter -= 1
-            flag = True
-        if statsFile is not None:
-            instrCounter += 1
-        mySwitch(instr[instrPointer])
-
-        # because of jump instructions
-        if instrPointer != instrPointerBefore:
-            instrCounter += 1
-
-        if flag:
-            pass
-        else:
-            instrPointer += 1
-
-        # counting variables
-        if statsFile is not None:
-            counter = 0
-            for var in hashTable["GF"]:
-                if var is not None:
-                    counter += 1
-            if "LF" in hashTable:
-                if hashTable["LF"] is not None:
-                    for var in hashTable["LF"]:
-                        if var is not None:
-                            counter += 1
-            if "TF" in hashTable:
-                if hashTable["TF"] is not None:
-                    for var in hashTable["TF"]:
-                        if var is not None:
-                            counter += 1
-            varCounter = max(varCounter, counter)
-
-    # writing stats into the file
-    if statsFile is not None:
-        for argv in sys.argv:
-            if argv == '--insts':
-                statsFile.write(str(instrCounter) + '\n')
-            if argv == '--vars':
-                statsFile.write(str(varCounter) + '\n')
-        statsFile.close()
+    sourceFile, inputFile, outputFile, statsFile, profileFile, args = argHandler()
+    if args.memo_clear:
+        clearMemo(args.memo_dir)
+        if args.source is None and args.input is None:
+            return 0
+    if args.serve is not None:
+        return serve(args.serve, args.jobs or availableCores())
+    if args.batch is not None:
+        return runBatch(sourceFile, outputFile, args.cache_dir)
+
+    if args.compile_binary is not None:
+        instr, labels, names = loadProgram(sourceFile, args.cache_dir)
+        try:
+            with open(args.compile_binary[0], "wb") as binaryFile:
+                writeBinary(instr, labels, names, binaryFile)
+        except OSError:
+            sys.exit(12)
+        return 0
+
+    if args.source_binary is not None:
+        program = readBinary(sourceFile)
+    else:
+        program = loadProgram(sourceFile, args.cache_dir)
+    interpreter = Interpreter(*program)
+    if args.input is not None and len(args.input) > 1:
+        return runForked(interpreter, args.input, outputFile, args.jobs or availableCores())
+    statsOptions = [argv for argv in sys.argv if argv in STATS_OPTIONS]
+    # profile needs real execution, so it isn't memoized
+    if args.memo_dir is not None and profileFile is None:
+        return runMemoized(interpreter, program, inputFile, outputFile, statsFile, statsOptions,
+                           args.memo_dir, MEMO_SIZE if args.memo_size is None else args.memo_size)
+    return interpreter.run(inputFile, outputFile, sys.stderr, statsFile, statsOptions, profileFile)
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        sys.exit(main())
+    except InterpretError as error:
+        sys.exit(error.code)
@@ -14,10 +14,11 @@ $parsePath = "parse.php";
 $intPath = "interpret.py";
 $jexam = "/pub/courses/ipp/jexamxml/jexamxml.jar";
 $recurse = false; $parse = false; $interpret = false;
+$jobs = 1; $worker = null;
 $testPassed = 0; $testFailures = 0; $jumped = 0;
 
 function argHandler($arguments, $argc){
-    global $dir, $recurse, $parse, $parsePath, $interpret, $intPath;
+    global $dir, $recurse, $parse, $parsePath, $interpret, $intPath, $jobs, $worker;
 
     if ($arguments === false){
         exit(10);
@@ -34,6 +35,7 @@ function argHandler($arguments, $argc){
         echo "	--parse-script File - path to parse.php\n";
         echo "	--parse-only - tests only for parse.php\n";
         echo "	--jexamxml File - specifies path to A7Soft JExamXML\n";
+        echo "	--jobs N - runs tests in N processes at once\n";
         exit(0);
     }
 
@@ -70,6 +72,19 @@ function argHandler($arguments, $argc){
         }
         $interpret = true;
     }
+    if (array_key_exists("jobs", $arguments)){
+        if ($arguments["jobs"] === false || !preg_match('/^[0-9]+$/', $arguments["jobs"]) || intval($arguments["jobs"]) < 1){
+            exit (10);
+        }
+        $jobs = intval($arguments["jobs"]);
+    }
+    //internal, used by runTests for its worker processes
+    if (array_key_exists("worker", $arguments)){
+        if ($arguments["worker"] === false || !preg_match('/^[0-9]+$/', $arguments["worker"]) || intval($arguments["worker"]) >= $jobs){
+            exit (10);
+        }
+        $worker = intval($arguments["worker"]);
+    }
     if (array_key_exists("int-script",$arguments)){
         if ($arguments["int-script"] === false){
             exit (10);
@@ -226,153 +241,146 @@ function isXmlStructureValid($file) {
     return $ret;
 }
 
-/****************************************************************/
-/****************************Main section************************/
-/****************************************************************/
-$longopts = array("help", "directory:", "recursive", "parse-script:", "parse-only", "jexamxml:", "int-script:", "int-only");
-$arguments = getopt("",$longopts);
-argHandler($arguments, $argc);
-$testFiles = directoryCheck($dir,$recurse);
-$sources = sortTestsToArray($testFiles);
-printHTMLHead();
-
-for ($i=0; $i < count($sources); $i++) {
+/*returns result of one test, null if the test is skipped, false if the test
+ *isn't reported (source wasn't parsed when both scripts are tested)
+ *every test uses its own temporary files, so more tests can run at once*/
+function runTest($test){
+    global $parse, $interpret, $parsePath, $intPath, $jexam;
     $output = array();
+    $rc = 0;
     // parse-only
     if ($parse && !$interpret){
-    	if (isXmlStructureValid($sources[$i]["src"]) == true){
-        	$jumped++;
-        	continue;
-    	}
-
-        exec("php7.4 $parsePath < ".$sources[$i]["src"],$output["out"],$output["rc"]);
-        $output["out"] = implode("\n",$output["out"]);
-        if ($output["rc"] == $sources[$i]["rc"]){
-            if ($output["rc"] != 0){
-                $success = "PASSED";
-                $testPassed++;
-                printTest($sources[$i]["src"],$output["rc"], $sources[$i]["rc"], $success);
-                continue;
-            }
-            $file = fopen("tempFile.out","w");
-            if (!$file)
-                exit(12);
-            fwrite($file,$output["out"]);
-            fclose($file);
-            exec("java -jar $jexam ". $sources[$i]["out"]. " tempFile.out diffs.xml  /D /pub/courses/ipp/jexamxml/options",$JXout,$JXrc);
-            unlink("tempFile.out");
-            if ($JXrc == 0){
-                $success = "PASSED";
-                $testPassed++;
-                printTest($sources[$i]["src"],$JXrc, $sources[$i]["rc"], $success);
-            } else {
-                $testFailures++;
-                $success = "FAILED";
-                printTest($sources[$i]["src"],$JXrc, $sources[$i]["rc"], $success);
-            }
-        } else {
-            $testFailures++;
-            $success = "FAILED";
-            printTest($sources[$i]["src"],$output["rc"], $sources[$i]["rc"], $success);
+        if (isXmlStructureValid($test["src"]) == true){
+            return null;
         }
-      // both
-    } else if (!$parse && !$interpret){
-        exec("php7.4 $parsePath < ".$sources[$i]["src"],$output["out"],$output["rc"]);
+
+        exec("php7.4 $parsePath < ".$test["src"],$output["out"],$output["rc"]);
         $output["out"] = implode("\n",$output["out"]);
-        if ($output["rc"] == 0){
-            $input = "";
-            if ($sources[$i]["in"] == ''){
-                $input = $sources[$i]["src"];
-            } else {
-                $input = $sources[$i]["in"];
-            }
-            exec("php7.4 $parsePath < ".$sources[$i]["src"]." | python3.8 $intPath --input=".$input,$output["out"],$output["rc"]);
-            $output["out"] = implode("\n",$output["out"]);
-            if ($output["rc"] == $sources[$i]["rc"]){
-                if ($output["rc"] != 0){
-                    $success = "PASSED";
-                    $testPassed++;
-                    printTest($sources[$i]["src"],$output["rc"], $sources[$i]["rc"], $success);
-                    continue;
-                }
-                if($sources[$i]["out"] === ""){
-			        if($output["out"] != "")
-			        	$output["diff"] = $output["out"];
-			        else
-				        $success = "PASSED";
-                        $testPassed++;
-                        printTest($sources[$i]["src"],$rc, $sources[$i]["rc"], $success);
-		        } else {
-		        	$file = fopen("tempFile.out","w");
-            		if (!$file)
-                		exit(12);
-            		fwrite($file,$output["out"]);
-            		fclose($file);
-			        exec("diff -q --ignore-space-change tempFile.out ".$sources[$i]["out"], $output["diff"], $rc);
-			        unlink("tempFile.out");
-			        if ($rc){
-                        $testFailures++;
-                        $success = "FAILED";
-                        printTest($sources[$i]["src"],$rc, $sources[$i]["rc"], $success);
-                    } else {
-                        $success = "PASSED";
-                        $testPassed++;
-                        printTest($sources[$i]["src"],$rc, $sources[$i]["rc"], $success);
-                    }
-		        }
-            } else {
-                $testFailures++;
-                $success = "FAILED";
-                printTest($sources[$i]["src"],$output["rc"], $sources[$i]["rc"], $success);
-            }
+        if ($output["rc"] != $test["rc"]){
+            return testResult($test, $output["rc"], "FAILED");
         }
-        //int-only
-    } else if (!$parse && $interpret){
-    	$input = "";
-        if ($sources[$i]["in"] == ''){
-            $input = $sources[$i]["src"];
-        } else {
-            $input = $sources[$i]["in"];
+        if ($output["rc"] != 0){
+            return testResult($test, $output["rc"], "PASSED");
         }
-        exec("python3.8 $intPath --input=".$input." <".$sources[$i]["src"], $output["out"], $output["rc"]);
+        $tempOut = tempnam(sys_get_temp_dir(), "ipp-out-");
+        $tempDiffs = tempnam(sys_get_temp_dir(), "ipp-diffs-");
+        if ($tempOut === false || $tempDiffs === false || file_put_contents($tempOut, $output["out"]) === false)
+            exit(12);
+        exec("java -jar $jexam ". $test["out"]. " $tempOut $tempDiffs  /D /pub/courses/ipp/jexamxml/options",$JXout,$JXrc);
+        unlink($tempOut);
+        unlink($tempDiffs);
+        return testResult($test, $JXrc, $JXrc == 0 ? "PASSED" : "FAILED");
+    }
+
+    // both
+    if (!$parse && !$interpret){
+        exec("php7.4 $parsePath < ".$test["src"],$output["out"],$output["rc"]);
         $output["out"] = implode("\n",$output["out"]);
-        if ($output["rc"] == $sources[$i]["rc"]){
-            if ($output["rc"] != 0){
-                $success = "PASSED";
-                $testPassed++;
-                printTest($sources[$i]["src"],$output["rc"], $sources[$i]["rc"], $success);
-                continue;
-            }
-            if($sources[$i]["out"] === ""){
-		        if($output["out"] != "")
-		        	$output["diff"] = $output["out"];
-		        else
-			        $success = "PASSED";
-                    $testPassed++;
-                    printTest($sources[$i]["src"],$rc, $sources[$i]["rc"], $success);
-	        } else {
-	        	$file = fopen("tempFile.out","w");
-        		if (!$file)
-            		exit(12);
-        		fwrite($file,$output["out"]);
-        		fclose($file);
-		        exec("diff -q --ignore-space-change tempFile.out ".$sources[$i]["out"], $output["diff"], $rc);
-		        unlink("tempFile.out");
-		        if ($rc){
-                    $testFailures++;
-                    $success = "FAILED";
-                    printTest($sources[$i]["src"],$rc, $sources[$i]["rc"], $success);
-                } else {
-                    $success = "PASSED";
-                    $testPassed++;
-                    printTest($sources[$i]["src"],$rc, $sources[$i]["rc"], $success);
-                }
-            }
-        } else {
-            $testFailures++;
-            $success = "FAILED";
-            printTest($sources[$i]["src"],$output["rc"], $sources[$i]["rc"], $success);
-    	}
+        if ($output["rc"] != 0){
+            return false;
+        }
+        $input = $test["in"] == '' ? $test["src"] : $test["in"];
+        exec("php7.4 $parsePath < ".$test["src"]." | python3.8 $intPath --input=".$input,$output["out"],$output["rc"]);
+    // int-only
+    } else {
+        $input = $test["in"] == '' ? $test["src"] : $test["in"];
+        exec("python3.8 $intPath --input=".$input." <".$test["src"], $output["out"], $output["rc"]);
+    }
+    $output["out"] = implode("\n",$output["out"]);
+    if ($output["rc"] != $test["rc"]){
+        return testResult($test, $output["rc"], "FAILED");
+    }
+    if ($output["rc"] != 0){
+        return testResult($test, $output["rc"], "PASSED");
+    }
+    //output isn't checked without .out file
+    if ($test["out"] === ""){
+        return testResult($test, $rc, "PASSED");
+    }
+    $tempOut = tempnam(sys_get_temp_dir(), "ipp-out-");
+    if ($tempOut === false || file_put_contents($tempOut, $output["out"]) === false)
+        exit(12);
+    exec("diff -q --ignore-space-change $tempOut ".$test["out"], $output["diff"], $rc);
+    unlink($tempOut);
+    return testResult($test, $rc, $rc ? "FAILED" : "PASSED");
+}
+
+/*creates result of the test for printTest*/
+function testResult($test, $rc, $success){
+    return array("src" => $test["src"], "rc" => $rc, "expRC" => $test["rc"], "success" => $success);
+}
+
+/*runs all tests and returns their results in the same order as tests
+ *tests are split among $jobs worker processes, which run this script
+ *again with --worker and write their results (serialized) to stdout*/
+function runTests($sources, $jobs){
+    global $argv;
+    if ($jobs <= 1){
+        return array_map("runTest", $sources);
+    }
+
+    $workers = array();
+    for ($worker = 0; $worker < $jobs && $worker < count($sources); $worker++){
+        $command = array_merge(array(PHP_BINARY, __FILE__), array_slice($argv, 1), array("--worker=$worker"));
+        $process = proc_open($command, array(1 => array("pipe", "w")), $pipes);
+        if ($process === false)
+            exit(99);
+        $workers[] = array($process, $pipes[1]);
+    }
+
+    $results = array();
+    foreach ($workers as list($process, $output)){
+        $workerResults = unserialize(stream_get_contents($output));
+        fclose($output);
+        $rc = proc_close($process);
+        if ($rc != 0)
+            exit($rc);
+        if ($workerResults === false)
+            exit(99);
+        $results = $results + $workerResults;
+    }
+    // results are printed in order of tests, not in order of finished workers
+    ksort($results);
+    return $results;
+}
+
+/*runs tests of the worker (every $jobs-th test from $worker) and writes
+ *their results to stdout*/
+function runWorker($sources, $jobs, $worker){
+    $results = array();
+    for ($i = $worker; $i < count($sources); $i += $jobs){
+        $results[$i] = runTest($sources[$i]);
+    }
+    echo serialize($results);
+}
+
+/****************************************************************/
+/****************************Main section************************/
+/****************************************************************/
+$longopts = array("help", "directory:", "recursive", "parse-script:", "parse-only", "jexamxml:", "int-script:", "int-only", "jobs:", "worker:");
+$arguments = getopt("",$longopts);
+argHandler($arguments, $argc);
+$testFiles = directoryCheck($dir,$recurse);
+$sources = sortTestsToArray($testFiles);
+if ($worker !== null){
+    runWorker($sources, $jobs, $worker);
+    exit(0);
+}
+printHTMLHead();
+$results = runTests($sources, $jobs);
+foreach ($results as $result){
+    if ($result === null){
+        $jumped++;
+        continue;
+    }
+    if ($result === false){
+        continue;
+    }
+    if ($result["success"] === "PASSED"){
+        $testPassed++;
+    } else {
+        $testFailures++;
     }
+    printTest($result["src"], $result["rc"], $result["expRC"], $result["success"]);
 }
-printHTMLEnd($testPassed,$testFailures, (count($sources)-$jumped));
\ No newline at end of file
+printHTMLEnd($testPassed,$testFailures, (count($sources)-$jumped));